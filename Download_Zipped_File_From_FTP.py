@@ -9,6 +9,13 @@
 #
 # Description: This is a template script for downloading a file from an FTP site
 # to a local or network drive.  Results and error messages are written to a text file.
+# Interrupted downloads are resumed from a ".part" file, and downloads are verified
+# by size (and checksum, when the FTP site publishes one) before they are unzipped.
+# Several files can be downloaded at the same time over a pool of FTP connections.
+# Files that haven't changed since the last run are not downloaded again, and only
+# zip file members that differ from the files already on disk are extracted.
+# Members can be selected with wildcard patterns, and members are extracted
+# in parallel by worker processes.
 #
 # Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
 # WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
@@ -19,7 +26,8 @@
 # ---------------------------------------------------------------------------
 
 # Import modules
-import sys, os, datetime, time, zipfile, ftplib
+import sys, os, datetime, time, zipfile, ftplib, hashlib, socket, fnmatch, Queue, json, zlib, itertools, multiprocessing
+from multiprocessing.pool import ThreadPool
 
 # Writes messages to a text file
 def message(message):
@@ -28,111 +36,609 @@ def message(message):
     return placeholder
 # end message()
 
-try:
-    # Get current date and time
-    currentTime = datetime.datetime.now()
-    # Format date as Year-Month-Day (2017-01-17
-    dateToday = currentTime.strftime("%Y-%m-%d")
-
-    # container for messages for log file
-    log_text = ''
-    # path and name of text file to store log messages
-    # sample: r'C:\Scripts\File Transfer\Download Geodatabase Results {}.txt'.format(dateToday)
-    log_file = ''
-
-    # Variables
-    # ftp server
-    ftp_server = ""
-    # user name for FTP
-    username = ''
-    # password for FTP
-    password = ''
-    # location to save file
-    # change this to the directory you want to save the file to
-    # sample: r'C:\GIS Data\'
-    localDir = ''
-    # zipped file on FTP you are downloading
-    zippedFileToDownload = 'Name_Of_File.zip'
-
-    # Download file from FTP site
-    # open ftp connection
-    ftp = ftplib.FTP(ftp_server)
-    print 'Established FTP connection'
-    log_text += message('Established FTP connection')
-    # login to ftp
-    ftp.login(username, password)
-    print 'Logged into FTP'
-    log_text += message('Logged into FTP')
-    # change directory to desired directory
-    ftp.cwd('SomeDirectory')
-    # get current ftp directory
-    ftpDir = ftp.pwd()
-    print 'Changed directories to {}'.format(ftpDir)
-    log_text += message('Changed directories to {}'.format(ftpDir))
-    # get list of files in current FTP directory
-    filesInFtpDir = ftp.nlst()
-    print 'Created list of files in {}'.format(ftpDir)
-    log_text += message('Created list of files in {}'.format(ftpDir))
-    # check if file is in list
-    if zippedFileToDownload in filesInFtpDir:
-        # download zipped file on ftp to local directory
-        with open(os.path.join(localDir, zippedFileToDownload), 'wb') as local_file:
-            ftp.retrbinary('RETR ' + zippedFileToDownload, local_file.write)
-            print 'Downloaded file to {}'.format(localDir)
-            log_text += message('Downloaded file to {}'.format(localDir))
-    else: # if file is not in list
-        print 'The file: {}, was not found in {}'.format(zippedFileToDownload, ftpDir)
-        log_text += message('The file: {}, was not found in {}'.format(zippedFileToDownload, ftpDir))
-    # close ftp connection
-    ftp.close()
-    print 'Closed FTP connection'
-    log_text += message('Closed FTP connection')
-
-    # Unzip zipped file
-    # get listing of files in local directory
-    filesInLocalDir = os.listdir(localDir)
-    # check if regional geodatabase is in directory
-    if zippedFileToDownload in filesInLocalDir:
-        # file object for zip file
-        localZipFile = os.path.join(localDir, zippedFileToDownload)
-        # verify file is a zipped file
-        if zipfile.is_zipfile(localZipFile):
-            # create zip file object
-            with zipfile.ZipFile(localZipFile) as z:
-                # unzip file to local directory
-                z.extractall(localDir)
-                print 'Completed unzipping file'
-                log_text += message('Completed unzipping file')
-        else: # file is not a zip file
-            print 'The file: {}, is not a zipped file'.format(zippedFileToDownload)
-            log_text += message('The file: {}, is not a zipped file'.format(zippedFileToDownload))
-    else: # file was not found on local directory.
-        print 'The file: {}, was not found in {}'.format(zippedFileToDownload, localDir)
-        log_text += message('The file: {}, was not found in {}'.format(zippedFileToDownload, localDir))
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    log_text += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    print 'Failed at Line {}\n'.format(tbE.tb_lineno)
-    # add the error message to the log message
-    log_text += "\nError: {}\n".format(str(e))
-    print 'Error: {}\n'.format(str(e))
-# handle exception error
-except Exception as e:
-    # Store information about the error
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    log_text += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    print 'Failed at Line {}\n'.format(tbE.tb_lineno)
-    # add the error message to the log message
-    log_text += "\nError: {}\n".format(e.message)
-    print 'Error: {}\n'.format(e.message)
-finally:
-    # write message to log file
+# Opens a logged in FTP connection in the download directory
+def connect_ftp(server, user, pwd, directory):
+    ftp = ftplib.FTP(server)
+    ftp.login(user, pwd)
+    if directory:
+        ftp.cwd(directory)
+    # binary mode is required for the SIZE and REST commands
+    ftp.voidcmd('TYPE I')
+    return ftp
+# end connect_ftp()
+
+# Returns the MD5 checksum of a local file, reading it in blocks
+def file_md5(file_path, block_size):
+    md5 = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            md5.update(block)
+    return md5.hexdigest()
+# end file_md5()
+
+# Returns the checksum stored in a checksum file on the FTP site (e.g. "Name_Of_File.zip.md5")
+def read_remote_checksum(ftp, checksum_file):
+    lines = []
+    ftp.retrlines('RETR ' + checksum_file, lines.append)
+    # retrlines switches to ASCII mode, so switch back to binary mode for SIZE and REST
+    ftp.voidcmd('TYPE I')
+    # checksum files are formatted as "<checksum>  <file name>"
+    return lines[0].split()[0].lower() if lines and lines[0].strip() else ''
+# end read_remote_checksum()
+
+# Downloads a file to a ".part" file next to the local file.  If the connection drops,
+# the download is resumed from the end of the ".part" file using a REST offset.
+# The size and modification time of the remote file are saved in a ".part.json" file, and a
+# ".part" file left by an earlier run is only resumed if the remote file has not changed since
+# (files on FTP sites without a modification time are downloaded again from the start).
+# Once complete, the size (and checksum, if provided) is verified and the ".part" file
+# is renamed to the local file.
+# login is the (server, user name, password, directory) used to reconnect
+# returns the FTP connection (which may have been re-opened), the MD5 checksum, the number of bytes transferred and log messages
+# if the download fails, the FTP connection is closed
+def download_file(ftp, login, remote_name, local_path, block_size, max_retries, resume=True, expected_md5=''):
+    log = ''
+    part_path = local_path + '.part'
+    part_info_path = part_path + '.json'
+    remote_size, remote_modified = remote_file_info(ftp, remote_name)
+    part_info = {'remote_size': remote_size, 'remote_modified': remote_modified}
+    try:
+        # remove a partial file left behind by an earlier run when not resuming,
+        # or when the remote file may have changed since it was started
+        if os.path.exists(part_path):
+            saved_info = None
+            if os.path.exists(part_info_path):
+                with open(part_info_path) as f:
+                    saved_info = json.load(f)
+            if not resume or remote_modified is None or saved_info != part_info:
+                if resume:
+                    print 'Discarding partial download of {}, since the file on the FTP has changed'.format(remote_name)
+                    log += message('Discarding partial download of {}, since the file on the FTP has changed'.format(remote_name))
+                os.remove(part_path)
+        # record the version of the remote file the ".part" file is from
+        with open(part_info_path, 'w') as f:
+            json.dump(part_info, f)
+        retries = 0
+        # bytes transferred in this run, which leaves out the part of the file resumed from an earlier run
+        transferred = [0]
+        while True:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            # partial file is larger than the remote file, so it can't be resumed
+            if offset > remote_size:
+                os.remove(part_path)
+                offset = 0
+            if offset == remote_size:
+                break
+            if offset:
+                print 'Resuming download of {} at byte {}'.format(remote_name, offset)
+                log += message('Resuming download of {} at byte {}'.format(remote_name, offset))
+            try:
+                with open(part_path, 'ab') as part_file:
+                    def write_block(block):
+                        part_file.write(block)
+                        transferred[0] += len(block)
+                    ftp.retrbinary('RETR ' + remote_name, write_block, block_size, offset or None)
+                break
+            except (EOFError, socket.error, ftplib.error_temp, ftplib.error_reply) as e:
+                retries += 1
+                if retries > max_retries:
+                    raise
+                print 'Download of {} interrupted ({}); reconnecting (attempt {} of {})'.format(remote_name, e, retries, max_retries)
+                log += message('Download of {} interrupted ({}); reconnecting (attempt {} of {})'.format(remote_name, e, retries, max_retries))
+                try:
+                    ftp.close()
+                except:
+                    pass
+                # wait a little longer after each failed attempt
+                time.sleep(retries * 5)
+                ftp = connect_ftp(*login)
+        # end while
+
+        # verify download before replacing the local file
+        local_size = os.path.getsize(part_path)
+        if local_size != remote_size:
+            raise IOError('Downloaded {} bytes of {}, expected {} bytes'.format(local_size, remote_name, remote_size))
+        local_md5 = file_md5(part_path, block_size)
+        if expected_md5 and local_md5 != expected_md5:
+            # a corrupt partial file can't be resumed, so start over on the next run
+            os.remove(part_path)
+            raise IOError('Checksum of {} ({}) does not match the expected checksum ({})'.format(remote_name, local_md5, expected_md5))
+        log += message('Verified {} ({} bytes, MD5 {})'.format(remote_name, local_size, local_md5))
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        os.rename(part_path, local_path)
+        os.remove(part_info_path)
+        return ftp, local_md5, transferred[0], log
+    except Exception:
+        # the connection may have been re-opened, and the caller only has the first one, so close it here
+        try:
+            ftp.close()
+        except:
+            pass
+        raise
+# end download_file()
+
+# Returns the size and modification time ("YYYYMMDDHHMMSS") of a file on the FTP
+# modification time is None if the FTP site supports neither MDTM nor MLST
+def remote_file_info(ftp, remote_name):
+    # directory listings switch to ASCII mode, and SIZE requires binary mode
+    ftp.voidcmd('TYPE I')
+    size = ftp.size(remote_name)
+    try:
+        # response is formatted as "213 YYYYMMDDHHMMSS"
+        modified = ftp.sendcmd('MDTM ' + remote_name).split()[1]
+    except ftplib.error_perm:
+        modified = None
+        try:
+            # response contains facts such as "modify=YYYYMMDDHHMMSS;size=1234; Name_Of_File.zip"
+            for fact in ftp.sendcmd('MLST ' + remote_name).split(';'):
+                if fact.strip().lower().startswith('modify='):
+                    modified = fact.split('=')[1].strip()
+        except ftplib.error_perm:
+            pass
+    return size, modified
+# end remote_file_info()
+
+# Reads the manifest of files downloaded on earlier runs
+def read_manifest(manifest_file):
+    if manifest_file and os.path.exists(manifest_file):
+        with open(manifest_file) as f:
+            return json.load(f)
+    return {}
+# end read_manifest()
+
+# Writes the manifest of downloaded files
+def write_manifest(manifest_file, manifest):
+    if manifest_file:
+        with open(manifest_file, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+# end write_manifest()
+
+# Checks whether the file on the FTP and the local copy are unchanged since the last download
+# entry is the manifest entry for the file; remote_info is the (size, modification time) on the FTP
+# if block_size is given, the MD5 checksum of the local copy is also checked against the manifest
+def is_unchanged(entry, remote_info, local_path, block_size=0):
+    if not entry or remote_info[1] is None or not os.path.exists(local_path):
+        return False
+    if not (entry.get('remote_size') == remote_info[0] and entry.get('remote_modified') == remote_info[1] and
+            entry.get('local_size') == os.path.getsize(local_path) and
+            entry.get('local_modified') == int(os.path.getmtime(local_path))):
+        return False
+    return not block_size or entry.get('md5') == file_md5(local_path, block_size)
+# end is_unchanged()
+
+# Returns the path a zip file member is extracted to, removing drive letters and
+# "..", so members can't be written outside of the destination directory
+def member_path(dest_dir, member_name):
+    member_name = os.path.splitdrive(member_name)[1]
+    parts = [part for part in member_name.replace('\\', '/').split('/') if part not in ('', '.', '..')]
+    return os.path.join(dest_dir, *parts)
+# end member_path()
+
+# Returns the CRC-32 of a local file, reading it in blocks
+def file_crc32(file_path, block_size):
+    crc = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            crc = zlib.crc32(block, crc)
+    return crc & 0xffffffff
+# end file_crc32()
+
+# Returns the modification time (seconds since 1970) of a zip file member
+# zip files store the local time, to the nearest 2 seconds
+def member_mtime(info):
+    return time.mktime(info.date_time + (0, 0, -1))
+# end member_mtime()
+
+# Checks whether the file extracted from a zip file member is unchanged
+# check is 'CRC' (size and CRC-32, reading the whole file), 'MTIME' (size and modification time) or 'SIZE' (size only)
+def member_unchanged(info, target, block_size, check):
+    if not os.path.isfile(target) or os.path.getsize(target) != info.file_size:
+        return False
+    if check == 'CRC':
+        return file_crc32(target, block_size) == info.CRC
+    if check == 'MTIME':
+        return abs(os.path.getmtime(target) - member_mtime(info)) <= 2
+    return True
+# end member_unchanged()
+
+# Returns the members of a zip file matching any of the include patterns (all members
+# if there are none) and none of the exclude patterns
+def select_members(infos, include, exclude):
+    selected = []
+    for info in infos:
+        if include and not any(fnmatch.fnmatch(info.filename, pattern) for pattern in include):
+            continue
+        if any(fnmatch.fnmatch(info.filename, pattern) for pattern in exclude):
+            continue
+        selected.append(info)
+    return selected
+# end select_members()
+
+# Streams a member of an open zip file to disk in blocks, checking the CRC-32 as it is written
+# the member is written to a ".part" file that is renamed once the CRC-32 is verified
+# returns the number of bytes written and the time taken in seconds
+def extract_member(z, info, target, block_size):
+    start_time = time.time()
+    target_dir = os.path.dirname(target)
+    if target_dir and not os.path.isdir(target_dir):
+        try:
+            os.makedirs(target_dir)
+        except OSError:
+            # directory was created by another worker process
+            if not os.path.isdir(target_dir):
+                raise
+    part_path = target + '.part'
+    crc = 0
+    size = 0
+    source = z.open(info)
+    try:
+        with open(part_path, 'wb') as out_file:
+            for block in iter(lambda: source.read(block_size), b''):
+                crc = zlib.crc32(block, crc)
+                size += len(block)
+                out_file.write(block)
+    finally:
+        source.close()
+    if (crc & 0xffffffff) != info.CRC or size != info.file_size:
+        os.remove(part_path)
+        raise zipfile.BadZipfile('Bad CRC-32 or size for {}'.format(info.filename))
+    if os.path.exists(target):
+        os.remove(target)
+    os.rename(part_path, target)
+    # give the file the modification time of the member, so it can be compared on later runs
+    os.utime(target, (time.time(), member_mtime(info)))
+    return size, time.time() - start_time
+# end extract_member()
+
+# Extracts a batch of zip file members in a worker process, which opens its own handle to the zip file
+# members that are unchanged on disk (see member_unchanged()) are skipped
+# job is (zip file, list of (member name, target file), block size, check)
+# returns a list of (member name, bytes written, time taken in seconds, error message (None if successful), True if skipped)
+def extract_members_job(job):
+    zip_path, members, block_size, check = job
+    results = []
+    try:
+        with zipfile.ZipFile(zip_path) as z:
+            for member_name, target in members:
+                try:
+                    info = z.getinfo(member_name)
+                    if member_unchanged(info, target, block_size, check):
+                        results.append((member_name, 0, 0, None, True))
+                        continue
+                    size, elapsed_time = extract_member(z, info, target, block_size)
+                    results.append((member_name, size, elapsed_time, None, False))
+                except Exception as e:
+                    results.append((member_name, 0, 0, str(e), False))
+            # end for
+    except Exception as e:
+        # the zip file could not be opened
+        results += [(member_name, 0, 0, str(e), False) for member_name, target in members[len(results):]]
+    return results
+# end extract_members_job()
+
+# Extracts the selected members of a zip file that are missing or differ from the files already on disk
+# members that are unchanged on disk (see member_unchanged() for the check values) are skipped
+# members of at least parallel_size bytes are each sent to the process pool (if there is one) on their own, and
+# smaller members are sent in batches of up to parallel_size bytes or batch_count members, so they are extracted
+# by the workers at the same time as the large members
+# returns the number of members extracted, skipped and failed, and log messages
+def extract_changed_members(zip_path, dest_dir, block_size, check='CRC', include=(), exclude=(), parallel_size=0, pool=None, batch_count=50):
+    log = ''
+    large_jobs = []
+    small_jobs = []
+    batch = []
+    batch_size = 0
+    with zipfile.ZipFile(zip_path) as z:
+        members = select_members(z.infolist(), include, exclude)
+    for info in members:
+        target = member_path(dest_dir, info.filename)
+        if info.filename.endswith('/'):
+            if not os.path.isdir(target):
+                os.makedirs(target)
+            continue
+        if pool is None:
+            # every member is extracted here, with one handle to the zip file
+            batch.append((info.filename, target))
+        elif info.file_size >= parallel_size:
+            large_jobs.append((zip_path, [(info.filename, target)], block_size, check))
+        else:
+            batch.append((info.filename, target))
+            batch_size += info.file_size
+            if batch_size >= parallel_size or len(batch) >= batch_count:
+                small_jobs.append((zip_path, batch, block_size, check))
+                batch = []
+                batch_size = 0
+    # end for
+    if batch:
+        small_jobs.append((zip_path, batch, block_size, check))
+    # the large members are sent first, so they start right away
+    jobs = large_jobs + small_jobs
+    if pool is not None:
+        job_results = pool.imap_unordered(extract_members_job, jobs)
+    else:
+        job_results = itertools.imap(extract_members_job, jobs)
+    extracted = 0
+    skipped = 0
+    failed = 0
+    for results in job_results:
+        for member_name, size, elapsed_time, error, unchanged in results:
+            if unchanged:
+                skipped += 1
+            elif error:
+                failed += 1
+                print 'Failed to extract {}: {}'.format(member_name, error)
+                log += message('Failed to extract {}: {}'.format(member_name, error))
+            else:
+                extracted += 1
+                log += message('Extracted {} ({} bytes, {:.0f} bytes/sec)'.format(member_name, size, size / max(elapsed_time, 0.001)))
+        # end for
+    # end for
+    return extracted, skipped, failed, log
+# end extract_changed_members()
+
+# Returns the files on the FTP that match a list of file names or wildcard patterns
+def match_remote_files(files_in_dir, patterns):
+    if isinstance(patterns, basestring):
+        patterns = [patterns]
+    matches = []
+    for pattern in patterns:
+        for name in fnmatch.filter(files_in_dir, pattern):
+            if name not in matches:
+                matches.append(name)
+    return matches
+# end match_remote_files()
+
+# Downloads a file on a download thread using a logged in connection from the connection pool.
+# The connection is returned to the pool for the next file, so connections are opened once per run.
+# job is (connection pool, login, block size, max retries, resume, remote file, local file, expected checksum)
+# returns the remote file name, MD5 checksum, an error message (None if successful) and log messages
+def pooled_download(job):
+    connection_pool, login, block_size, max_retries, resume, remote_name, local_path, expected_md5 = job
+    ftp = connection_pool.get()
+    log = ''
     try:
-        with open(log_file, 'w') as f:
-            f.write(str(log_text))
-    except:
-        pass
\ No newline at end of file
+        if ftp is None:
+            ftp = connect_ftp(*login)
+        start_time = time.time()
+        ftp, local_md5, transferred, log = download_file(ftp, login, remote_name, local_path, block_size, max_retries, resume, expected_md5)
+        elapsed_time = max(time.time() - start_time, 0.001)
+        size_mb = os.path.getsize(local_path) / 1048576.0
+        # the rate only counts the bytes transferred in this run, not the part resumed from an earlier run
+        transferred_mb = transferred / 1048576.0
+        print 'Downloaded {} ({:.1f} MB, {:.1f} MB transferred) in {:.1f} seconds ({:.2f} MB/sec)'.format(remote_name, size_mb, transferred_mb, elapsed_time, transferred_mb / elapsed_time)
+        log += message('Downloaded {} ({:.1f} MB, {:.1f} MB transferred) in {:.1f} seconds ({:.2f} MB/sec)'.format(remote_name, size_mb, transferred_mb, elapsed_time, transferred_mb / elapsed_time))
+        return remote_name, local_md5, None, log
+    except Exception as e:
+        # the state of the connection is unknown, so a new one is opened for the next file
+        try:
+            ftp.close()
+        except:
+            pass
+        ftp = None
+        return remote_name, None, str(e), log
+    finally:
+        connection_pool.put(ftp)
+# end pooled_download()
+
+# the script only runs when it is executed directly, since the worker processes used to
+# extract zip file members import this script
+if __name__ == '__main__':
+    try:
+        # Get current date and time
+        currentTime = datetime.datetime.now()
+        # Format date as Year-Month-Day (2017-01-17
+        dateToday = currentTime.strftime("%Y-%m-%d")
+
+        # container for messages for log file
+        log_text = ''
+        # path and name of text file to store log messages
+        # sample: r'C:\Scripts\File Transfer\Download Geodatabase Results {}.txt'.format(dateToday)
+        log_file = ''
+
+        # Variables
+        # ftp server
+        ftp_server = ""
+        # user name for FTP
+        username = ''
+        # password for FTP
+        password = ''
+        # location to save file
+        # change this to the directory you want to save the file to
+        # sample: r'C:\GIS Data\'
+        localDir = ''
+        # zipped file on FTP you are downloading
+        zippedFileToDownload = 'Name_Of_File.zip'
+        # to download several files in one run, list the zipped files or wildcard patterns
+        # (e.g. ['County_*.zip', 'State_Roads.zip']); zippedFileToDownload is ignored when this is set
+        filesToDownload = []
+        # number of FTP connections used to download files at the same time
+        maxConnections = 4
+        # directory on FTP containing the file
+        ftpDirectory = 'SomeDirectory'
+        # size of blocks (in bytes) to transfer and write to disk
+        blockSize = 1024 * 1024
+        # number of times to reconnect and resume a download after the connection drops
+        maxRetries = 5
+        # set to False to discard a partially downloaded ".part" file from an earlier run
+        resumeDownload = True
+        # extension of a checksum file published next to the zipped file on the FTP (e.g. "Name_Of_File.zip.md5")
+        # set to '' to only verify the size of the download
+        checksumFileSuffix = '.md5'
+        # file recording the size and modification time of each downloaded file, so files that haven't
+        # changed on the FTP since the last run are not downloaded and unzipped again
+        # set to '' to always download files
+        manifestFile = os.path.join(localDir, 'ftp_download_manifest.json')
+        # how extracted files of zip files that haven't changed since the last run are checked:
+        # 'CRC' compares the size and CRC-32 of every file (reading them all), and the MD5 checksum of the zip file with the manifest
+        # 'MTIME' compares the size and modification time of every file with the zip file
+        # 'SIZE' only compares the size of every file, so a file edited without changing size is not restored
+        # members of zip files that were downloaded are always compared by CRC-32
+        unchangedMemberCheck = 'MTIME'
+        # wildcard patterns of zip file members to extract (e.g. ['*.gdb/*']); leave empty to extract every member
+        includeMembers = []
+        # wildcard patterns of zip file members not to extract (e.g. ['*.lock', '*/Thumbs.db'])
+        excludeMembers = []
+        # zip file members of at least this size (in bytes) are extracted on their own by a worker process,
+        # and smaller members are extracted in batches of up to this size
+        parallelExtractSize = 8 * 1024 * 1024
+        # number of worker processes used to extract members; set to 0 to extract members one at a time
+        extractProcesses = multiprocessing.cpu_count()
+
+        # Download file(s) from FTP site
+        # open ftp connection, login, and change directory to desired directory
+        ftp_login = (ftp_server, username, password, ftpDirectory)
+        ftp = connect_ftp(*ftp_login)
+        print 'Established FTP connection and logged into FTP'
+        log_text += message('Established FTP connection and logged into FTP')
+        # get current ftp directory
+        ftpDir = ftp.pwd()
+        print 'Changed directories to {}'.format(ftpDir)
+        log_text += message('Changed directories to {}'.format(ftpDir))
+        # get list of files in current FTP directory
+        filesInFtpDir = ftp.nlst()
+        print 'Created list of files in {}'.format(ftpDir)
+        log_text += message('Created list of files in {}'.format(ftpDir))
+        # check which files are in list
+        if filesToDownload:
+            downloadList = match_remote_files(filesInFtpDir, filesToDownload)
+            if not downloadList:
+                print 'No files matching {} were found in {}'.format(filesToDownload, ftpDir)
+                log_text += message('No files matching {} were found in {}'.format(filesToDownload, ftpDir))
+        elif zippedFileToDownload in filesInFtpDir:
+            downloadList = [zippedFileToDownload]
+        else: # if file is not in list
+            downloadList = []
+            print 'The file: {}, was not found in {}'.format(zippedFileToDownload, ftpDir)
+            log_text += message('The file: {}, was not found in {}'.format(zippedFileToDownload, ftpDir))
+
+        # list of files that were downloaded
+        downloadedFiles = []
+        # MD5 checksum of each downloaded file, recorded in the manifest once the file is unzipped
+        downloadedMd5 = {}
+        # list of files skipped because they haven't changed since the last download
+        unchangedFiles = []
+        # manifest of files downloaded on earlier runs
+        manifest = read_manifest(manifestFile)
+        remote_info = {}
+        for remote_name in downloadList:
+            remote_info[remote_name] = remote_file_info(ftp, remote_name)
+            if manifestFile and is_unchanged(manifest.get(remote_name), remote_info[remote_name], os.path.join(localDir, remote_name), blockSize if unchangedMemberCheck == 'CRC' else 0):
+                unchangedFiles.append(remote_name)
+                print 'The file: {}, has not changed since it was last downloaded'.format(remote_name)
+                log_text += message('The file: {}, has not changed since it was last downloaded'.format(remote_name))
+        downloadList = [remote_name for remote_name in downloadList if remote_name not in unchangedFiles]
+
+        if downloadList:
+            download_jobs = []
+            for remote_name in downloadList:
+                # get expected checksum if one is published with the file
+                expected_md5 = ''
+                if checksumFileSuffix and remote_name + checksumFileSuffix in filesInFtpDir:
+                    expected_md5 = read_remote_checksum(ftp, remote_name + checksumFileSuffix)
+                download_jobs.append((remote_name, os.path.join(localDir, remote_name), expected_md5))
+            # pool of logged in connections shared by the download threads
+            # the open connection is reused, and the others are opened the first time they are needed
+            connection_count = max(1, min(maxConnections, len(download_jobs)))
+            connection_pool = Queue.Queue()
+            connection_pool.put(ftp)
+            for i in range(connection_count - 1):
+                connection_pool.put(None)
+            download_settings = (connection_pool, ftp_login, blockSize, maxRetries, resumeDownload)
+            # download zipped files on ftp to local directory
+            thread_pool = ThreadPool(connection_count)
+            try:
+                download_results = thread_pool.map(pooled_download, [download_settings + job for job in download_jobs])
+            finally:
+                thread_pool.close()
+                thread_pool.join()
+            for remote_name, local_md5, download_error, download_log in download_results:
+                log_text += download_log
+                if download_error:
+                    print 'Failed to download {}: {}'.format(remote_name, download_error)
+                    log_text += message('Failed to download {}: {}'.format(remote_name, download_error))
+                else:
+                    downloadedFiles.append(remote_name)
+                    downloadedMd5[remote_name] = local_md5
+            print 'Downloaded {} of {} file(s) to {}'.format(len(downloadedFiles), len(downloadList), localDir)
+            log_text += message('Downloaded {} of {} file(s) to {}'.format(len(downloadedFiles), len(downloadList), localDir))
+            # close pooled ftp connections
+            while not connection_pool.empty():
+                pooled_ftp = connection_pool.get()
+                if pooled_ftp is not None:
+                    pooled_ftp.close()
+        else:
+            # close ftp connection
+            ftp.close()
+        print 'Closed FTP connection(s)'
+        log_text += message('Closed FTP connection(s)')
+
+        # Unzip zipped file(s)
+        # get listing of files in local directory
+        filesInLocalDir = os.listdir(localDir)
+        # worker processes for extracting large zip file members
+        extract_pool = None
+        if extractProcesses > 0 and (downloadedFiles or unchangedFiles):
+            extract_pool = multiprocessing.Pool(extractProcesses)
+        for zipped_file in downloadedFiles + unchangedFiles:
+            # check if regional geodatabase is in directory
+            if zipped_file in filesInLocalDir:
+                # file object for zip file
+                localZipFile = os.path.join(localDir, zipped_file)
+                # verify file is a zipped file
+                if zipfile.is_zipfile(localZipFile):
+                    # unzip selected members to local directory, skipping members that are already on disk
+                    # members of unchanged zip files are checked with unchangedMemberCheck, which can avoid reading them
+                    extracted, skipped, failed, extract_log = extract_changed_members(localZipFile, localDir, blockSize, unchangedMemberCheck if zipped_file in unchangedFiles else 'CRC',
+                                                                                      includeMembers, excludeMembers, parallelExtractSize, extract_pool)
+                    log_text += extract_log
+                    # record download in manifest once every member is extracted,
+                    # so a file that could not be unzipped is downloaded again on the next run
+                    if zipped_file in downloadedMd5 and not failed:
+                        manifest[zipped_file] = {
+                            'remote_size': remote_info[zipped_file][0],
+                            'remote_modified': remote_info[zipped_file][1],
+                            'local_size': os.path.getsize(localZipFile),
+                            'local_modified': int(os.path.getmtime(localZipFile)),
+                            'md5': downloadedMd5[zipped_file]
+                        }
+                    print 'Completed unzipping {} ({} members extracted, {} unchanged, {} failed)'.format(zipped_file, extracted, skipped, failed)
+                    log_text += message('Completed unzipping {} ({} members extracted, {} unchanged, {} failed)'.format(zipped_file, extracted, skipped, failed))
+                else: # file is not a zip file
+                    print 'The file: {}, is not a zipped file'.format(zipped_file)
+                    log_text += message('The file: {}, is not a zipped file'.format(zipped_file))
+            else: # file was not found on local directory.
+                print 'The file: {}, was not found in {}'.format(zipped_file, localDir)
+                log_text += message('The file: {}, was not found in {}'.format(zipped_file, localDir))
+        # end for
+        if extract_pool is not None:
+            extract_pool.close()
+            extract_pool.join()
+        write_manifest(manifestFile, manifest)
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        log_text += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        print 'Failed at Line {}\n'.format(tbE.tb_lineno)
+        # add the error message to the log message
+        log_text += "\nError: {}\n".format(str(e))
+        print 'Error: {}\n'.format(str(e))
+    # handle exception error
+    except Exception as e:
+        # Store information about the error
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        log_text += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        print 'Failed at Line {}\n'.format(tbE.tb_lineno)
+        # add the error message to the log message
+        log_text += "\nError: {}\n".format(e.message)
+        print 'Error: {}\n'.format(e.message)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_text))
+        except:
+            pass
\ No newline at end of file
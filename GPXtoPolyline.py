@@ -6,36 +6,126 @@
 # "Telling the stories of our world through the power of maps"
 
 # Import system models
-import arcpy, sys
-
-try:
-    # Define parameter variables for use in ArcGIS toolbox script
-    inputGPX = arcpy.GetParameterAsText(0)
-    outputFeatureClass = arcpy.GetParameterAsText(1)
-
-    # Convert the GPX file into in_memory features
-    arcpy.GPXtoFeatures_conversion(inputGPX, 'in_memory\gpx_layer')
-
-    # Add message that GPX file has been succesfully converted to layer in Geoprocessing window
-    arcpy.AddMessage("GPX file converted to feature class")
-
-    # Convert the tracks into lines.
-    arcpy.PointsToLine_management('in_memory\gpx_layer', outputFeatureClass)
-
-    # Add message that Polyline feature has been created in Geoprocessing window
-    arcpy.AddMessage("GPX file converted to polyline feature class")
-
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # Write the error message to tool's dialog window
-    arcpy.AddError("Failed at Line {}\n".format(tbE.tb_lineno))
-    arcpy.AddError("Error: {}".format(str(e)))
-# handle exception error
-except Exception as e:
-    # Store information about the error
-    tbE = sys.exc_info()[2]
-    # Write the error message to tool's dialog window
-    arcpy.AddError("Failed at Line {}\n".format(tbE.tb_lineno))
-    arcpy.AddErro("Error: {}".format(e.message))
\ No newline at end of file
+import arcpy, sys, os, glob, time, itertools, functools, multiprocessing
+# note the imported "gpx_tracks" helper module that is located within this "ArcPy" repo
+import gpx_tracks
+
+# Returns a sorted list of the GPX files for a GPX file, a folder of GPX files or a wildcard (e.g. C:\GPX\*.gpx)
+def find_gpx_files(input_path):
+    # a file is used as is, since file names can contain wildcard characters such as [ and ]
+    if os.path.isfile(input_path):
+        return [input_path]
+    if os.path.isdir(input_path):
+        input_path = os.path.join(input_path, '*.gpx')
+    return sorted(path for path in glob.glob(input_path) if os.path.isfile(path))
+# end find_gpx_files()
+
+# the GPX files are read in worker processes, so the tool code only runs in the main process
+if __name__ == '__main__':
+    try:
+        # Define parameter variables for use in ArcGIS toolbox script
+        # GPX file, folder of GPX files, or wildcard for GPX files (e.g. C:\GPX\*.gpx)
+        inputGPX = arcpy.GetParameterAsText(0)
+        outputFeatureClass = arcpy.GetParameterAsText(1)
+        # Optional parameter (Boolean) to use the GPX To Features and Points To Line geoprocessing tools
+        # instead of reading the GPX file directly
+        useGeoprocessingTools = arcpy.GetParameterAsText(2).lower() == 'true'
+        # Optional parameter (Long) for the number of processes used to read GPX files
+        # defaults to the number of CPU cores
+        processCount = int(arcpy.GetParameterAsText(3) or multiprocessing.cpu_count())
+        # Optional parameter (Double) for the tolerance, in meters, used to simplify the tracks
+        # vertices closer than this to the simplified track are removed; 0 keeps every vertex
+        simplifyTolerance = float(arcpy.GetParameterAsText(4) or 0)
+
+        # GPX files to convert
+        gpx_files = find_gpx_files(inputGPX)
+        if not gpx_files:
+            raise ValueError("No GPX files found for {}".format(inputGPX))
+
+        if useGeoprocessingTools:
+            if len(gpx_files) > 1:
+                raise ValueError("The geoprocessing tools can only convert one GPX file at a time")
+
+            # Convert the GPX file into in_memory features
+            arcpy.GPXtoFeatures_conversion(gpx_files[0], 'in_memory\gpx_layer')
+
+            # Add message that GPX file has been succesfully converted to layer in Geoprocessing window
+            arcpy.AddMessage("GPX file converted to feature class")
+
+            # Convert the tracks into lines.
+            arcpy.PointsToLine_management('in_memory\gpx_layer', outputFeatureClass)
+        else:
+            # GPX coordinates are WGS 1984 latitude and longitude
+            sr = arcpy.SpatialReference(4326)
+
+            # Create the polyline feature class with fields for the name of each track, the GPX file it came from,
+            # and the length (meters), duration (seconds) and average speed (kilometers per hour) of the track
+            # field names are no longer than 10 characters, the limit for shapefiles
+            arcpy.CreateFeatureclass_management(os.path.dirname(outputFeatureClass), os.path.basename(outputFeatureClass), 'POLYLINE', spatial_reference=sr)
+            arcpy.AddField_management(outputFeatureClass, 'Name', 'TEXT', field_length=255)
+            arcpy.AddField_management(outputFeatureClass, 'SourceFile', 'TEXT', field_length=255)
+            arcpy.AddField_management(outputFeatureClass, 'LENGTH_M', 'DOUBLE')
+            arcpy.AddField_management(outputFeatureClass, 'DURATION_S', 'DOUBLE')
+            arcpy.AddField_management(outputFeatureClass, 'SPEED_KMH', 'DOUBLE')
+
+            # function that reads (and simplifies) the tracks of one GPX file
+            read_gpx_file = functools.partial(gpx_tracks.read_gpx_file, tolerance=simplifyTolerance)
+
+            # Get the start time of reading the GPX files
+            start_time = time.time()
+            pool = None
+            try:
+                if len(gpx_files) > 1 and processCount > 1:
+                    # Read the GPX files in worker processes
+                    # when the tool runs inside ArcMap, sys.executable is ArcMap, so start the workers with Python instead
+                    if not os.path.basename(sys.executable).lower().startswith('python'):
+                        multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'pythonw.exe'))
+                    pool = multiprocessing.Pool(min(processCount, len(gpx_files)))
+                    results = pool.imap_unordered(read_gpx_file, gpx_files)
+                else:
+                    results = itertools.imap(read_gpx_file, gpx_files)
+
+                # Write the tracks from every GPX file, one polyline for each track, as the files are read
+                # this process is the only one that writes to the feature class
+                track_count = 0
+                failed_files = 0
+                with arcpy.da.InsertCursor(outputFeatureClass, ['SHAPE@', 'Name', 'SourceFile', 'LENGTH_M', 'DURATION_S', 'SPEED_KMH']) as cursor:
+                    for gpx_file, tracks, error in results:
+                        if error:
+                            failed_files += 1
+                            arcpy.AddWarning("Could not read {}. {}".format(gpx_file, error))
+                            continue
+                        for name, wkb, length, duration, speed in tracks:
+                            cursor.insertRow([arcpy.FromWKB(wkb, sr), name[:255], gpx_file[-255:], length, duration, speed])
+                            track_count += 1
+                        # end for
+                    # end for
+                # end with
+            finally:
+                if pool is not None:
+                    pool.terminate()
+            # end try
+            elapsed_seconds = time.time() - start_time
+
+            # Add message with the number of tracks and files per second in Geoprocessing window
+            arcpy.AddMessage("Read {} tracks from {} GPX files in {} seconds ({} files per second)".format(track_count, len(gpx_files) - failed_files, round(elapsed_seconds, 2), round(len(gpx_files) / max(elapsed_seconds, 0.001), 2)))
+            if failed_files:
+                arcpy.AddWarning("{} GPX files could not be read".format(failed_files))
+
+        # Add message that Polyline feature has been created in Geoprocessing window
+        arcpy.AddMessage("GPX file converted to polyline feature class")
+
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # Write the error message to tool's dialog window
+        arcpy.AddError("Failed at Line {}\n".format(tbE.tb_lineno))
+        arcpy.AddError("Error: {}".format(str(e)))
+    # handle exception error
+    except Exception as e:
+        # Store information about the error
+        tbE = sys.exc_info()[2]
+        # Write the error message to tool's dialog window
+        arcpy.AddError("Failed at Line {}\n".format(tbE.tb_lineno))
+        arcpy.AddError("Error: {}".format(e.message))
\ No newline at end of file
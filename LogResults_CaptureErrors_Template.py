@@ -23,6 +23,8 @@
 
 # Import system modules
 import arcpy, sys, time, datetime
+# note the imported "wait_for_result" helper module that is located within this "ArcPy" repo
+import wait_for_result
 
 # Run geoprocessing tool.
 # If there is an error with the tool, it will break and run the code within the except statement
@@ -44,24 +46,22 @@ try:
     log_message = ''
 
     # Get the start time of the geoprocessing tool(s)
-    start_time = time.clock()
+    start_time = time.time()
 
     # Put ArcPy geoprocessing code within this section
     result # = arcpy command with appropriate parameters
 
     # write result messages to log
     # delay writing results until geoprocessing tool gets the completed code
-    while result.status < 4:
-        time.sleep(0.2)
+    # raises an error if the tool failed
+    # ArcPy tools return once they have finished; for results returned before they finish (e.g. geoprocessing
+    # service jobs) add timeout=seconds to cancel the result and raise an error if it does not finish in time
+    # Get the total time to run the geoprocessing tool(s), measured when the tool finishes
+    status, elapsed_time = wait_for_result.wait_for_result(result, start_time=start_time)
     # store tool result message in a variable
     result_value = result.getMessages()
     # add the tool's message to the log file message
     log_message += "completed {}\n".format(str(result_value))
-
-    # Get the end time of the geoprocessing tool(s)
-    finish_time = time.clock()
-    # Get the total time to run the geoprocessing tool(s)
-    elapsed_time = finish_time - start_time
     # total time in minutes
     elapsed_time_minutes =  round((elapsed_time / 60), 2)
 
@@ -2,6 +2,14 @@
 # Description: Create a feature class from a CSV file containing latitude, longitude,
 # and attributes for a layer.  Script creates a empty feature class, add fields to
 # the feature class, and then loops through a CSV file to add records to the feature class
+# The CSV file is read in batches of rows, so memory use does not grow with the size of the file
+# For large files, the bulk load option parses the CSV file into NumPy arrays and writes
+# the feature class in one call, and very large files can be split into shards that are
+# parsed by several processes at the same time
+# Rows with missing, invalid or out of range coordinates are written to a reject CSV file
+# with a reason code instead of stopping the script
+# Coordinates can be projected from the coordinate system of the CSV file to the
+# coordinate system of the feature class as they are loaded
 # Created by: Patrick McKinney, Cumberland County GIS
 # Contact: pnmcartography@gmail.com
 # "Telling the stories of our world through the power of maps"
@@ -9,75 +17,521 @@
 ##############################################################################################
 
 # Import the arcpy module and set the current workspace
-import arcpy, sys
-
-try:
-    arcpy.env.workspace = r"enter file path within quotes"
-
-    # Create a variable to hold the spatial reference for the feature class
-    # Place WKID (well-know ID) within ()
-    # Geographic Coordinate System reference: http://resources.arcgis.com/en/help/arcgis-rest-api/index.html#/Geographic_coordinate_systems/02r300000105000000/
-    # Projected Coordinate System reference: http://resources.arcgis.com/en/help/arcgis-rest-api/index.html#/Projected_coordinate_systems/02r3000000vt000000/
-    sr = arcpy.SpatialReference()
-
-    # Create a new feature class
-    # Options for "GEOMETRY TYPE" are "POINT", "MULTIPOINT", "POLYGON", or "POLYLINE"
-    # This script is developed to create a Point feature class
-    arcpy.CreateFeatureclass_management(arcpy.env.workspace, "Name of Feature Class", "GEOMETRY TYPE", spatial_reference = sr)
-
-    # Add a Field to the feature class
-    # Repeat this code block for as many fields are as needed
-    # Field types can be "TEXT", "FLOAT", "DOUbLE", "SHORT", "LONG", "DATE", "BLOB", "RASTER", or "GUID"
-    arcpy.AddField_management("Name of Feature Class", "Field Name", "Field Type")
-
-
-    # Create a list holding field names from Feature Class
-    iflds = ["SHAPE@XY", "Field Name", "Field Name"]
-
-    # Create an arcpy.da.InsertCursor for Feature Class
-    # iflds is the fields to edit through the insert cursor
-    iCur = arcpy.da.InsertCursor("Name of Feature Class", iflds)
-
-    # Open CSV file containing information to create feature class from.
-    # Loop through each record in CSV file and add information into Feature Class.
-    # Loop uses "if count > 1" because it is assumed the first row in the CSV file
-    # will contain the field titles
-    count = 1
-
-    # Make sure to place the corresponding number for each field from the CSV file within the []
-    for ln in open(r"File path to csv file", 'r').readlines():
-        lnstrip = ln.strip()
-        if count > 1:
-            dataList = ln.split(",")
-            # Number in array containing Latitude
-            lat = dataList[1]
-            # Number in array containing longitude
-            lon = dataList[2]
-            # Create variables for each field in CSV file. Use corresponding array number from CSV file
-            var = dataList[0]
-            # float() is used to convert string to a numberic field
-            # include all variables from above, seperated by commas
-            ivals = [(float(lon), float(lat)), var]
-            iCur.insertRow(ivals)
-        count += 1
-
-    # Delete the cursor to close the cursor and release the exclusive lock
-    del iCur
-
-    print "Script completed"
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # Print the line number the error occured
-    print("Failed at Line {}\n".format(tbE.tb_lineno))
-    # Print the error message
-    print("Error: {}".format(str(e)))
-# handle exception error
-except Exception as e:
-    # Store information about the error
-    tbE = sys.exc_info()[2]
-    # Print the line number the error occured
-    print("Failed at Line {}\n".format(tbE.tb_lineno))
-    # Print the error message
-    print("Error: {}".format(e.message))
\ No newline at end of file
+import arcpy, sys, os, csv, time, math, itertools, random, multiprocessing, numpy
+
+# NumPy data types for the numeric and date field types (TEXT fields are sized to the longest value)
+numpy_types = {'FLOAT': 'f4', 'DOUBLE': 'f8', 'SHORT': 'i2', 'LONG': 'i4', 'DATE': 'M8[us]'}
+
+# projection parameters for each pair of spatial references, and spatial references loaded in this process
+projection_cache = {}
+spatial_reference_cache = {}
+
+# Groups the rows from a csv reader into lists of up to batch_size rows, along with the
+# line number of each row (counted from where the reader started)
+def batch_rows(reader, batch_size):
+    batch = []
+    line_numbers = []
+    for row in reader:
+        # skip blank lines
+        if not row:
+            continue
+        batch.append(row)
+        line_numbers.append(reader.line_num)
+        if len(batch) >= batch_size:
+            yield batch, line_numbers
+            batch = []
+            line_numbers = []
+    if batch:
+        yield batch, line_numbers
+# end batch_rows()
+
+# Reads a CSV file one row at a time and yields lists of up to batch_size rows and their line numbers,
+# so only one batch of rows is held in memory at a time
+def read_csv_batches(csv_file, batch_size, skip_header=True):
+    # the csv module handles quoted values containing commas
+    with open(csv_file, 'rb') as f:
+        reader = csv.reader(f)
+        if skip_header:
+            next(reader, None)
+        for batch, line_numbers in batch_rows(reader, batch_size):
+            yield batch, line_numbers
+# end read_csv_batches()
+
+# Returns the row of field titles from a CSV file
+def read_csv_header(csv_file):
+    with open(csv_file, 'rb') as f:
+        return next(csv.reader(f), [])
+# end read_csv_header()
+
+# Splits a CSV file into shards of about shard_size bytes that start and end on line breaks
+# returns a list of (start, end) byte offsets; the header row is not part of any shard
+def csv_shards(csv_file, shard_size, skip_header=True):
+    file_size = os.path.getsize(csv_file)
+    with open(csv_file, 'rb') as f:
+        if skip_header:
+            f.readline()
+        offsets = [f.tell()]
+        while offsets[-1] < file_size:
+            # move to the start of the line following the line containing the shard boundary
+            f.seek(max(offsets[-1] + shard_size - 1, offsets[-1]))
+            f.readline()
+            offsets.append(min(f.tell(), file_size))
+    return zip(offsets[:-1], offsets[1:])
+# end csv_shards()
+
+# Converts an array of strings to floats in one step, with empty or invalid values as NaN
+def to_float_array(values):
+    values = numpy.asarray(values)
+    values = numpy.where(values == '', 'nan', values)
+    try:
+        return values.astype('f8')
+    except ValueError:
+        # some values aren't numbers, so convert the values one at a time
+        converted = numpy.empty(len(values), 'f8')
+        for i, value in enumerate(values):
+            try:
+                converted[i] = float(value)
+            except ValueError:
+                converted[i] = numpy.nan
+        return converted
+# end to_float_array()
+
+# Returns the parameters for projecting coordinates from source_sr to target_sr
+# Parameters are computed once for each pair of spatial references and transformation and cached.
+# Projections from geographic coordinates to Lambert Conformal Conic or Transverse Mercator
+# (e.g. State Plane and UTM) are calculated with NumPy; other projections, and projections
+# that need a geographic transformation, are projected a point at a time with ArcPy
+def projection_parameters(source_sr, target_sr, transformation=''):
+    key = (source_sr.factoryCode or source_sr.exportToString(), target_sr.factoryCode or target_sr.exportToString(), transformation)
+    if key in projection_cache:
+        return projection_cache[key]
+    projection_name = target_sr.projectionName if target_sr.type == 'Projected' else ''
+    if source_sr.type == 'Geographic' and not transformation and target_sr.type == 'Geographic':
+        params = {'method': 'IDENTITY'}
+    elif source_sr.type == 'Geographic' and not transformation and projection_name in ('Lambert_Conformal_Conic', 'Transverse_Mercator', 'Gauss_Kruger'):
+        # ellipsoid of the target coordinate system
+        a = target_sr.GCS.semiMajorAxis
+        f = target_sr.GCS.flattening
+        e2 = f * (2 - f)
+        params = {'a': a, 'e2': e2, 'e': math.sqrt(e2), 'k0': target_sr.scaleFactor or 1.0,
+                  'lon0': math.radians(target_sr.centralMeridian), 'fe': target_sr.falseEasting,
+                  'fn': target_sr.falseNorthing, 'units': target_sr.metersPerUnit}
+        lat0 = math.radians(target_sr.latitudeOfOrigin)
+        if projection_name == 'Lambert_Conformal_Conic':
+            params['method'] = 'LCC'
+            lat1 = math.radians(target_sr.standardParallel1)
+            # one standard parallel (1SP) versions use the latitude of origin
+            lat2 = math.radians(target_sr.standardParallel2) if target_sr.standardParallel2 else lat1
+            m1 = lcc_m(lat1, e2)
+            t1 = lcc_t(lat1, params['e'])
+            if abs(lat1 - lat2) > 1e-10:
+                n = (math.log(m1) - math.log(lcc_m(lat2, e2))) / (math.log(t1) - math.log(lcc_t(lat2, params['e'])))
+            else:
+                n = math.sin(lat1)
+            params['n'] = n
+            params['aF'] = a * params['k0'] * m1 / (n * t1 ** n)
+            params['rho0'] = params['aF'] * lcc_t(lat0, params['e']) ** n
+        else:
+            params['method'] = 'TM'
+            params['M0'] = tm_meridian_distance(lat0, a, e2)
+    else:
+        params = {'method': 'ARCPY', 'source': source_sr.exportToString(), 'target': target_sr.exportToString(), 'transformation': transformation}
+    projection_cache[key] = params
+    return params
+# end projection_parameters()
+
+# Terms of the Lambert Conformal Conic projection (Snyder, Map Projections: A Working Manual, p. 107)
+def lcc_m(lat, e2):
+    return numpy.cos(lat) / numpy.sqrt(1 - e2 * numpy.sin(lat) ** 2)
+# end lcc_m()
+
+def lcc_t(lat, e):
+    sin_lat = numpy.sin(lat)
+    return numpy.tan(math.pi / 4 - lat / 2) / ((1 - e * sin_lat) / (1 + e * sin_lat)) ** (e / 2)
+# end lcc_t()
+
+# Distance along the meridian from the equator to a latitude (Snyder, p. 61)
+def tm_meridian_distance(lat, a, e2):
+    e4 = e2 * e2
+    e6 = e4 * e2
+    return a * ((1 - e2 / 4 - 3 * e4 / 64 - 5 * e6 / 256) * lat
+                - (3 * e2 / 8 + 3 * e4 / 32 + 45 * e6 / 1024) * numpy.sin(2 * lat)
+                + (15 * e4 / 256 + 45 * e6 / 1024) * numpy.sin(4 * lat)
+                - (35 * e6 / 3072) * numpy.sin(6 * lat))
+# end tm_meridian_distance()
+
+# Projects arrays of longitudes (x) and latitudes (y) in one step using projection_parameters()
+# returns arrays of projected x and y values; NaN values stay NaN
+def project_coordinates(x, y, params):
+    method = params['method']
+    if method == 'IDENTITY':
+        return x, y
+    if method == 'ARCPY':
+        source = load_spatial_reference(params['source'])
+        target = load_spatial_reference(params['target'])
+        projected_x = numpy.nan * numpy.ones(len(x))
+        projected_y = numpy.nan * numpy.ones(len(y))
+        for i in numpy.flatnonzero(numpy.isfinite(x) & numpy.isfinite(y)):
+            point = arcpy.PointGeometry(arcpy.Point(x[i], y[i]), source).projectAs(target, params['transformation']).firstPoint
+            projected_x[i] = point.X
+            projected_y[i] = point.Y
+        return projected_x, projected_y
+    lon = numpy.radians(x)
+    lat = numpy.radians(y)
+    # difference from the central meridian, wrapped to -180 to 180 degrees
+    dlon = (lon - params['lon0'] + math.pi) % (2 * math.pi) - math.pi
+    if method == 'LCC':
+        rho = params['aF'] * lcc_t(lat, params['e']) ** params['n']
+        theta = params['n'] * dlon
+        easting = rho * numpy.sin(theta)
+        northing = params['rho0'] - rho * numpy.cos(theta)
+    else:
+        # Transverse Mercator (Snyder, p. 61)
+        a, e2, k0 = params['a'], params['e2'], params['k0']
+        ep2 = e2 / (1 - e2)
+        sin_lat = numpy.sin(lat)
+        cos_lat = numpy.cos(lat)
+        N = a / numpy.sqrt(1 - e2 * sin_lat ** 2)
+        T = numpy.tan(lat) ** 2
+        C = ep2 * cos_lat ** 2
+        A = dlon * cos_lat
+        M = tm_meridian_distance(lat, a, e2)
+        easting = k0 * N * (A + (1 - T + C) * A ** 3 / 6 + (5 - 18 * T + T ** 2 + 72 * C - 58 * ep2) * A ** 5 / 120)
+        northing = k0 * (M - params['M0'] + N * numpy.tan(lat) * (A ** 2 / 2 + (5 - T + 9 * C + 4 * C ** 2) * A ** 4 / 24
+                                                                  + (61 - 58 * T + T ** 2 + 600 * C - 330 * ep2) * A ** 6 / 720))
+    # false easting and northing are in the units of the coordinate system
+    return easting / params['units'] + params['fe'], northing / params['units'] + params['fn']
+# end project_coordinates()
+
+# Returns a spatial reference from its string representation, creating it once per process
+def load_spatial_reference(sr_string):
+    if sr_string not in spatial_reference_cache:
+        sr = arcpy.SpatialReference()
+        sr.loadFromString(sr_string)
+        spatial_reference_cache[sr_string] = sr
+    return spatial_reference_cache[sr_string]
+# end load_spatial_reference()
+
+# Checks the coordinates of a batch of rows in one step, projecting them if projection is not None
+# geographic is True when the coordinates in the CSV file are longitude and latitude in degrees
+# extent is the (xmin, ymin, xmax, ymax) the (projected) coordinates must fall within, or None
+# projection is the result of projection_parameters(), or None
+# returns arrays of the (projected) x and y values and of the reason code
+# for each row that fails a check ('' for rows that pass)
+def validate_coordinates(x_values, y_values, geographic, extent, projection=None):
+    x_values = numpy.char.strip(numpy.asarray(x_values, 'S'))
+    y_values = numpy.char.strip(numpy.asarray(y_values, 'S'))
+    x = to_float_array(x_values)
+    y = to_float_array(y_values)
+    # each row gets the reason code of the first check it fails
+    with numpy.errstate(invalid='ignore'):
+        checks = [('EMPTY_COORDINATE', (x_values == '') | (y_values == '')),
+                  ('NOT_NUMERIC', ~(numpy.isfinite(x) & numpy.isfinite(y)))]
+        if geographic:
+            checks.append(('LAT_OUT_OF_RANGE', numpy.abs(y) > 90))
+            checks.append(('LON_OUT_OF_RANGE', numpy.abs(x) > 180))
+        if projection is not None:
+            x, y = project_coordinates(x, y, projection)
+        if extent:
+            checks.append(('OUTSIDE_EXTENT', (x < extent[0]) | (y < extent[1]) | (x > extent[2]) | (y > extent[3])))
+    reasons = numpy.zeros(len(x), 'S16')
+    for reason, failed in checks:
+        reasons[failed & (reasons == '')] = reason
+    return x, y, reasons
+# end validate_coordinates()
+
+# Converts the accepted rows of a batch of CSV columns into rows for the insert cursor
+def convert_batch(columns, csv_fields, x, y, accepted):
+    indexes = numpy.flatnonzero(accepted)
+    points = zip(x[indexes].tolist(), y[indexes].tolist())
+    field_values = [[columns[csv_index][i] for i in indexes] for field_name, field_type, csv_index in csv_fields]
+    return [[point] + list(values) for point, values in itertools.izip(points, itertools.izip(*field_values))] if field_values else [[point] for point in points]
+# end convert_batch()
+
+# Converts a column of CSV values to a NumPy array for the field type
+def convert_column(values, field_type):
+    field_type = field_type.upper()
+    if field_type in ('FLOAT', 'DOUBLE'):
+        return to_float_array(values).astype(numpy_types[field_type])
+    if field_type in ('SHORT', 'LONG'):
+        # NumPy integer arrays can't hold nulls, so empty values are written as 0
+        converted = to_float_array(values)
+        converted[~numpy.isfinite(converted)] = 0
+        return converted.astype(numpy_types[field_type])
+    if field_type == 'DATE':
+        # dates must be formatted as YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS; empty values are null
+        return numpy.array(values, numpy_types[field_type])
+    # text values are decoded so they are written as unicode
+    return numpy.char.decode(numpy.asarray(values, 'S'), 'utf-8')
+# end convert_column()
+
+# Converts the accepted rows of a batch of CSV columns into a NumPy structured array with POINT_X and
+# POINT_Y coordinate fields and a field for each of csv_fields (["Field Name", "Field Type", CSV column number])
+def batch_to_array(columns, csv_fields, x, y, accepted):
+    converted = [('POINT_X', x), ('POINT_Y', y)]
+    converted += [(field_name, convert_column(columns[csv_index], field_type)) for field_name, field_type, csv_index in csv_fields]
+    array = numpy.empty(len(x), [(name, values.dtype) for name, values in converted])
+    for name, values in converted:
+        array[name] = values
+    return array[accepted]
+# end batch_to_array()
+
+# Combines the arrays for each batch into one array, widening text fields to the longest value
+def merge_arrays(arrays):
+    if len(arrays) == 1:
+        return arrays[0]
+    dtype = [(name, max([a.dtype[name] for a in arrays], key=lambda t: t.itemsize)) for name in arrays[0].dtype.names]
+    return numpy.concatenate([a.astype(dtype) for a in arrays])
+# end merge_arrays()
+
+# Parses a batch of CSV rows into insert cursor rows, or into a NumPy array when bulk_load is True
+# settings is (csv_fields, lat_index, lon_index, bulk_load, geographic, extent, projection)
+# returns the parsed rows and a list of (line number, reason code, row) for each rejected row
+def parse_batch(batch, line_numbers, settings):
+    csv_fields, lat_index, lon_index, bulk_load, geographic, extent, projection = settings
+    # turn the rows into columns, filling in missing values at the end of short rows
+    columns = list(itertools.izip_longest(*batch, fillvalue=''))
+    column_count = max([lat_index, lon_index] + [field[2] for field in csv_fields]) + 1
+    columns += [('',) * len(batch)] * (column_count - len(columns))
+    x, y, reasons = validate_coordinates(columns[lon_index], columns[lat_index], geographic, extent, projection)
+    accepted = reasons == ''
+    rejects = [(line_numbers[i], reasons[i], batch[i]) for i in numpy.flatnonzero(~accepted)]
+    if bulk_load:
+        return batch_to_array(columns, csv_fields, x, y, accepted), rejects
+    return convert_batch(columns, csv_fields, x, y, accepted), rejects
+# end parse_batch()
+
+# Parses a shard of a CSV file in a worker process
+# job is (shard number, CSV file, start offset, end offset, batch size, settings for parse_batch)
+# returns the shard number, the number of lines in the shard, and a list with the result of
+# parse_batch for each batch of rows in the shard (line numbers are counted from the start of the shard)
+def parse_shard(job):
+    shard_index, csv_file, start, end, batch_size, settings = job
+    with open(csv_file, 'rb') as f:
+        f.seek(start)
+        # rows must not contain line breaks within quoted values
+        reader = csv.reader(iter(lambda: f.readline() if f.tell() < end else '', ''))
+        parsed = [parse_batch(batch, line_numbers, settings) for batch, line_numbers in batch_rows(reader, batch_size)]
+        return shard_index, reader.line_num, parsed
+# end parse_shard()
+
+# Yields the parsed batches from each shard as it is returned by the worker processes
+# Rejected rows are yielded (with None in place of parsed rows) once the line numbers of all earlier
+# shards are known, so their line numbers can be counted from the start of the CSV file
+def merge_shards(shard_results, header_lines):
+    pending = {}
+    next_shard = 0
+    line_offset = header_lines
+    for shard_index, line_count, parsed_batches in shard_results:
+        shard_rejects = []
+        for parsed, rejects in parsed_batches:
+            shard_rejects += rejects
+            yield parsed, []
+        pending[shard_index] = (line_count, shard_rejects)
+        while next_shard in pending:
+            line_count, shard_rejects = pending.pop(next_shard)
+            if shard_rejects:
+                yield None, [(line_number + line_offset, reason, row) for line_number, reason, row in shard_rejects]
+            line_offset += line_count
+            next_shard += 1
+# end merge_shards()
+
+# Writes a CSV file of random points (NAME, LAT, LON) for benchmarking
+def write_synthetic_csv(csv_file, row_count):
+    with open(csv_file, 'wb') as f:
+        writer = csv.writer(f)
+        writer.writerow(['NAME', 'LAT', 'LON'])
+        for i in xrange(row_count):
+            writer.writerow(['Point, {}'.format(i), round(random.uniform(39.9, 40.3), 6), round(random.uniform(-77.6, -76.9), 6)])
+# end write_synthetic_csv()
+
+# Returns the peak memory used by the script in megabytes
+def peak_memory_mb():
+    try:
+        # resource module is only available on Unix, where ru_maxrss is in kilobytes
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    except ImportError:
+        # on Windows, get the peak working set of the process
+        import ctypes
+        from ctypes import wintypes
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / 1048576.0
+# end peak_memory_mb()
+
+# the script only runs when it is executed directly, since the worker processes used to
+# parse shards of the CSV file import this script
+if __name__ == '__main__':
+    try:
+        arcpy.env.workspace = r"enter file path within quotes"
+
+        # Create a variable to hold the spatial reference for the feature class
+        # Place WKID (well-know ID) within ()
+        # Geographic Coordinate System reference: http://resources.arcgis.com/en/help/arcgis-rest-api/index.html#/Geographic_coordinate_systems/02r300000105000000/
+        # Projected Coordinate System reference: http://resources.arcgis.com/en/help/arcgis-rest-api/index.html#/Projected_coordinate_systems/02r3000000vt000000/
+        sr = arcpy.SpatialReference()
+
+        # name of the new feature class
+        fc_name = "Name of Feature Class"
+
+        # Fields to add to the feature class
+        # Repeat a line for as many fields are as needed: ["Field Name", "Field Type", number of the column in the CSV file]
+        # Field types can be "TEXT", "FLOAT", "DOUBLE", "SHORT", "LONG", or "DATE"
+        csv_fields = [["Field Name", "TEXT", 0]]
+
+        # CSV file containing information to create feature class from
+        csv_file = r"File path to csv file"
+        # it is assumed the first row in the CSV file will contain the field titles
+        # set to False if the CSV file does not have a row of field titles
+        csv_has_header = True
+        # CSV file rejected rows are written to, with the line number and reason each row was rejected
+        # reason codes are EMPTY_COORDINATE, NOT_NUMERIC, LAT_OUT_OF_RANGE, LON_OUT_OF_RANGE, and OUTSIDE_EXTENT
+        reject_file = r"File path to reject csv file"
+        # extent (xmin, ymin, xmax, ymax) in the units of sr that coordinates must fall within
+        # e.g. (-77.62, 39.97, -76.86, 40.32); if set to None, the XY domain of sr is used
+        valid_extent = None
+        # spatial reference of the coordinates in the CSV file, if it differs from sr (e.g. arcpy.SpatialReference(4326) for WGS84)
+        # coordinates are projected to sr as they are loaded; set to None if the coordinates are in sr
+        csv_sr = None
+        # geographic transformation between the datums of csv_sr and sr (e.g. 'WGS_1984_(ITRF00)_To_NAD_1983')
+        # leave empty to project State Plane and UTM coordinates with NumPy, ignoring the datum shift
+        # (about 1-2 meters between WGS84 and NAD83); with a transformation, points are projected one at a time
+        transformation = ''
+        # Make sure to place the corresponding number for each field from the CSV file
+        # Number in array containing Latitude
+        lat_index = 1
+        # Number in array containing longitude
+        lon_index = 2
+        # number of CSV rows read and inserted at a time
+        # larger batches are slightly faster, smaller batches use less memory
+        batch_size = 10000
+        # set to True to parse the CSV file into NumPy arrays and write the feature class in one call
+        # this is much faster for large files, but the whole file is held in memory
+        # the feature class also gets POINT_X and POINT_Y fields with the coordinates
+        bulk_load = False
+        # set to more than 1 to split the CSV file into shards that are parsed by this many processes
+        # at the same time (e.g. multiprocessing.cpu_count()); values in the CSV file must not contain line breaks
+        parse_processes = 1
+        # size of each shard of the CSV file in bytes
+        shard_size = 32 * 1024 * 1024
+        # set to False to add rows in the order shards finish parsing rather than the order of the CSV file
+        keep_row_order = True
+        # set to a number of rows to write a CSV file of random points to csv_file before loading it
+        # use this to benchmark the script; any existing csv_file is overwritten
+        synthetic_rows = 0
+
+        if synthetic_rows:
+            write_synthetic_csv(csv_file, synthetic_rows)
+            print "Wrote {} synthetic rows to {}".format(synthetic_rows, csv_file)
+
+        # coordinates are checked against the range of latitude and longitude for a geographic
+        # coordinate system, and against the valid extent after they are projected
+        geographic = (csv_sr or sr).type == 'Geographic'
+        projection = projection_parameters(csv_sr, sr, transformation) if csv_sr else None
+        if valid_extent is None:
+            try:
+                valid_extent = tuple(float(value) for value in sr.domain.split())
+            except (AttributeError, ValueError):
+                valid_extent = None
+
+        start_time = time.time()
+        row_count = 0
+        # Parse the CSV file in batches of rows
+        parse_settings = (csv_fields, lat_index, lon_index, bulk_load, geographic, valid_extent, projection)
+        if parse_processes > 1:
+            # each worker process parses a shard of the file, and the results are merged back here
+            pool = multiprocessing.Pool(parse_processes)
+            shard_jobs = [(shard_index, csv_file, start, end, batch_size, parse_settings) for shard_index, (start, end) in enumerate(csv_shards(csv_file, shard_size, csv_has_header))]
+            if keep_row_order:
+                shard_results = pool.imap(parse_shard, shard_jobs)
+            else:
+                shard_results = pool.imap_unordered(parse_shard, shard_jobs)
+            parsed_batches = merge_shards(shard_results, 1 if csv_has_header else 0)
+        else:
+            pool = None
+            parsed_batches = (parse_batch(batch, line_numbers, parse_settings) for batch, line_numbers in read_csv_batches(csv_file, batch_size, csv_has_header))
+
+        # Create the reject file
+        reject_count = 0
+        reject_csv = open(reject_file, 'wb')
+        reject_writer = csv.writer(reject_csv)
+        reject_writer.writerow(['CSV_LINE', 'REJECT_REASON'] + (read_csv_header(csv_file) if csv_has_header else []))
+
+        if bulk_load:
+            # Combine the batches of rows parsed into typed NumPy arrays
+            arrays = []
+            for array, rejects in parsed_batches:
+                reject_writer.writerows([line_number, reason] + row for line_number, reason, row in rejects)
+                reject_count += len(rejects)
+                if array is not None:
+                    arrays.append(array)
+            if arrays:
+                array = merge_arrays(arrays)
+                row_count = len(array)
+                # Create the feature class from the array in one call
+                arcpy.da.NumPyArrayToFeatureClass(array, os.path.join(arcpy.env.workspace, fc_name), ('POINT_X', 'POINT_Y'), sr)
+        else:
+            # Create a new feature class
+            # Options for "GEOMETRY TYPE" are "POINT", "MULTIPOINT", "POLYGON", or "POLYLINE"
+            # This script is developed to create a Point feature class
+            arcpy.CreateFeatureclass_management(arcpy.env.workspace, fc_name, "POINT", spatial_reference = sr)
+
+            # Add a Field to the feature class for each of csv_fields
+            for field_name, field_type, csv_index in csv_fields:
+                arcpy.AddField_management(fc_name, field_name, field_type)
+
+            # Create a list holding field names from Feature Class
+            iflds = ["SHAPE@XY"] + [field[0] for field in csv_fields]
+
+            # Create an arcpy.da.InsertCursor for Feature Class
+            # iflds is the fields to edit through the insert cursor
+            iCur = arcpy.da.InsertCursor(fc_name, iflds)
+
+            # Add the parsed batches of rows into Feature Class, and write rejected rows to the reject file
+            for ivals_batch, rejects in parsed_batches:
+                reject_writer.writerows([line_number, reason] + row for line_number, reason, row in rejects)
+                reject_count += len(rejects)
+                if ivals_batch is not None:
+                    for ivals in ivals_batch:
+                        iCur.insertRow(ivals)
+                    row_count += len(ivals_batch)
+
+            # Delete the cursor to close the cursor and release the exclusive lock
+            del iCur
+
+        reject_csv.close()
+        print "Rejected {} rows; see {}".format(reject_count, reject_file)
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+        # report rows per second and peak memory use
+        elapsed_time = max(time.time() - start_time, 0.001)
+        # peak memory use is for this process; worker processes parsing shards are not included
+        print "Inserted {} rows in {:.1f} seconds ({:.0f} rows/sec) using {} process(es), peak memory use {:.1f} MB".format(row_count, elapsed_time, row_count / elapsed_time, max(parse_processes, 1), peak_memory_mb())
+        print "Script completed"
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # Print the line number the error occured
+        print("Failed at Line {}\n".format(tbE.tb_lineno))
+        # Print the error message
+        print("Error: {}".format(str(e)))
+    # handle exception error
+    except Exception as e:
+        # Store information about the error
+        tbE = sys.exc_info()[2]
+        # Print the line number the error occured
+        print("Failed at Line {}\n".format(tbE.tb_lineno))
+        # Print the error message
+        print("Error: {}".format(e.message))
\ No newline at end of file
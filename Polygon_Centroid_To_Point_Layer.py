@@ -23,7 +23,94 @@
 # ---------------------------------------------------------------------------
 
 # Import system modules
-import arcpy, sys, time, datetime, os
+import arcpy, sys, time, datetime, os, itertools, threading, Queue, hashlib, json
+# note the imported "polygon_centroids" helper module that is located within this "ArcPy" repo
+import polygon_centroids
+
+# Returns a hash of the geometry (WKB) and attributes of a polygon
+def hash_polygon(wkb, attributes):
+    digest = hashlib.md5(bytes(wkb) if wkb else '')
+    digest.update(repr(tuple(attributes)))
+    return digest.hexdigest()
+# end hash_polygon()
+
+# Reads the polygon layer in batches and yields lists of (centroid, NAME, FACILITY_ID, ADDRESS) tuples
+# 'NUMPY' engine calculates the centroids of each batch with the polygon_centroids helper module
+# 'ARCPY' engine uses the centroid from the first field ('SHAPE@TRUECENTROID' or 'SHAPE@CENTROID')
+# when interior is True, the 'NUMPY' engine moves centroids that are outside their polygon to an interior point
+# within interior_precision map units of the point farthest from the polygon edges (1% of the polygon size when it is None)
+# when centroid_counts is a dictionary, the number of centroids moved to an interior point is added to centroid_counts['moved']
+# when current_hashes is a dictionary, the hash of each polygon is stored in it by the value of id_field
+# when known_hashes is also given, only the polygons that are new or changed since known_hashes are yielded
+def read_centroid_batches(polygon_layer, polygon_fields, centroid_engine, batch_size, id_field='FACILITY_ID', current_hashes=None, known_hashes=None, interior=False, interior_precision=None, centroid_counts=None):
+    attribute_count = len(polygon_fields) - 1
+    id_index = polygon_fields.index(id_field)
+    cursor_fields = list(polygon_fields)
+    if current_hashes is not None and centroid_engine != 'NUMPY':
+        # the polygon geometry is needed for the hash
+        cursor_fields.append('SHAPE@WKB')
+    with arcpy.da.SearchCursor(polygon_layer,cursor_fields) as cursor:
+        while True:
+            # read the next batch of rows
+            batch = list(itertools.islice(cursor, batch_size))
+            if not batch:
+                break
+            if current_hashes is not None:
+                changed = []
+                for row in batch:
+                    key = u'{}'.format(row[id_index])
+                    row_hash = hash_polygon(row[0] if centroid_engine == 'NUMPY' else row[-1], row[1:attribute_count + 1])
+                    current_hashes[key] = row_hash
+                    if known_hashes is None or known_hashes.get(key) != row_hash:
+                        changed.append(row)
+                # end for
+                batch = changed
+                if not batch:
+                    continue
+            if centroid_engine == 'NUMPY':
+                # calculate the centroids of the batch at once
+                centroids = polygon_centroids.wkb_centroids([row[0] for row in batch], interior, interior_precision, centroid_counts)
+            else:
+                centroids = [row[0] for row in batch]
+            yield [(centroid,) + tuple(row[1:attribute_count + 1]) for centroid, row in zip(centroids, batch)]
+        # end while
+    # end with
+# end read_centroid_batches()
+
+# Yields where clauses that select the features of a layer with the given id_field values
+# values are split into groups of chunk_size to keep each where clause a reasonable length
+def id_where_clauses(layer, id_field, keys, chunk_size=1000):
+    field_type = arcpy.ListFields(layer, id_field)[0].type
+    if field_type in ('String', 'Guid', 'GlobalID'):
+        values = [u"'{}'".format(key.replace(u"'", u"''")) for key in keys]
+    else:
+        values = list(keys)
+    delimited_field = arcpy.AddFieldDelimiters(layer, id_field)
+    for start in range(0, len(values), chunk_size):
+        yield u'{} IN ({})'.format(delimited_field, u','.join(values[start:start + chunk_size]))
+    # end for
+# end id_where_clauses()
+
+# Writer stage of the pipeline, run in its own thread
+# takes batches of records from point_queue and inserts them into the point layer until it gets None
+# the number of records written, or the error that stopped the writer, is stored in writer_status
+def write_points(point_layer, point_fields, point_queue, writer_status):
+    try:
+        # the Insert Cursor is created in the writer thread, which is the only thread that uses it
+        with arcpy.da.InsertCursor(point_layer,point_fields) as cursor:
+            while True:
+                batch = point_queue.get()
+                if batch is None:
+                    break
+                for record in batch:
+                    cursor.insertRow(record)
+                # end for
+                writer_status['count'] += len(batch)
+            # end while
+        # end with
+    except Exception as e:
+        writer_status['error'] = e
+# end write_points()
 
 # Run geoprocessing tool.
 # If there is an error with the tool, it will break and run the code within the except statement
@@ -48,77 +135,196 @@ try:
     # Get the start time of the geoprocessing tool(s)
     start_time = time.clock()
 
-    # 1. Copy data for features from polygon layer to a list
-    # list to contain data for each record
-    features_list = []
     # Polygon Layer
     # update to your polygon layer
     polygon_layer = r'C:\GIS\Geodata.gdb\Polygon_Layer'
+    # engine used to calculate the centroids
+    # 'NUMPY' reads the polygon rings in batches and calculates the centroids with the polygon_centroids helper module
+    # 'ARCPY' asks ArcGIS for the centroid of each polygon ('SHAPE@TRUECENTROID')
+    centroid_engine = 'NUMPY'
+    # number of polygons read, and passed to the writer, at a time
+    batch_size = 10000
+    # where to put the point for each polygon
+    # 'CENTROID' uses the true centroid, which can be outside concave or multipart polygons
+    # 'INTERIOR' uses the true centroid when it is inside the polygon, otherwise a point inside the polygon
+    # ('NUMPY' engine uses the pole of inaccessibility, 'ARCPY' engine uses the label point)
+    point_location = 'CENTROID'
+    # how close, in map units, the 'INTERIOR' points of the 'NUMPY' engine are to the point farthest from the polygon edges
+    # smaller values take longer to calculate; None uses 1% of the width or height of each polygon, whatever the map units
+    interior_precision = None
+    # maximum number of batches waiting for the writer
+    # when the queue is full, reading waits for the writer to catch up
+    queue_size = 4
     # fields from polygon layer
     # include any fields from polygon layer you want within the point layer
-    # 'SHAPE@TRUECENTROID' gives us the x,y coordinates to use for the point layer
-    polygon_fields = ['SHAPE@TRUECENTROID', 'NAME', 'FACILITY_ID', 'ADDRESS']
-
-    # Create a Search Cursor to loop through the polygon feature class and copy
-    # each record to the features_list variable
-    with arcpy.da.SearchCursor(polygon_layer,polygon_fields) as cursor:
-        for row in cursor:
-            # append item to features_list
-            featuresList.append([row[0],row[1],row[2],row[3]])
-        # end for
-    # end with
-
-    # write messages to text file
-    # update message as desired
-    log_msg += 'Completed copying features from polygon layer to list container\n'
-
-    # 2. Create a shell feature class for point layer
+    # the first field gives us the x,y coordinates to use for the point layer
+    # 'SHAPE@WKB' (the polygon rings) with the 'NUMPY' engine, or with the 'ARCPY' engine
+    # 'SHAPE@TRUECENTROID' ('CENTROID') or 'SHAPE@CENTROID' ('INTERIOR')
+    if centroid_engine == 'NUMPY':
+        shape_field = 'SHAPE@WKB'
+    elif point_location == 'INTERIOR':
+        shape_field = 'SHAPE@CENTROID'
+    else:
+        shape_field = 'SHAPE@TRUECENTROID'
+    polygon_fields = [shape_field, 'NAME', 'FACILITY_ID', 'ADDRESS']
+    # Point layer fields
+    # 'SHAPE@XY' defines where the point is located
+    # the other fields should match what was created in step #2 and the fields from the polygon layer
+    point_fields = ['SHAPE@XY', 'NAME', 'FACILITY_ID', 'ADDRESS']
     # name of feature class
     fc_name = 'Point_Layer'
     # location of feature class
     output_location = r'C:\GIS\Geodata.gdb'
-    # projected or geographic coordinate system for feature class
-    sr = arcpy.SpatialReference(0000)
+    # point layer
+    point_layer = os.path.join(output_location,fc_name)
 
-    # create feature class
-    arcpy.CreateFeatureclass_management(output_location,fc_name,'POINT',spatial_reference=sr)
-    # add message
-     # update message as desired
-    log_msg += '\nCreated empty feature class for Points Layer\n'
+    # incremental mode
+    # when True, a hash of the geometry and attributes of each polygon is saved to hash_file,
+    # and the next run only inserts, updates or deletes the points of polygons that changed
+    # the first run (or any run without hash_file) rebuilds the point layer, so the point layer must not exist
+    # or arcpy.env.overwriteOutput must be True
+    # delete hash_file to rebuild the point layer after changing centroid_engine or point_location
+    incremental = False
+    # json file of polygon hashes from the last successful run
+    hash_file = r'C:\GIS\Results\Polygon_To_Point_Hashes.json'
+    # field that identifies each polygon and point; values must be unique and not null
+    id_field = 'FACILITY_ID'
+    # hashes of the polygons in this run
+    current_hashes = {} if incremental else None
+    # number of centroids moved to an interior point
+    centroid_counts = {'moved': 0}
 
-    # 3. Add fields to Point layer
-    # These fields should match the fields from the polygon_fields variable with the
-    # exception of the 'SHAPE@TRUECENTROID' field
-    # point layer created in step #2
-    point_layer = os.path.join(output_location,fc_name)
+    if incremental and arcpy.Exists(point_layer) and os.path.exists(hash_file):
+        # Update only the points of polygons that changed since the last run
+        with open(hash_file) as f:
+            known_hashes = json.load(f)
+        # new or changed polygons, by FACILITY_ID
+        changed_records = {}
+        for batch in read_centroid_batches(polygon_layer, polygon_fields, centroid_engine, batch_size, id_field, current_hashes, known_hashes, point_location == 'INTERIOR', interior_precision, centroid_counts):
+            for record in batch:
+                changed_records[u'{}'.format(record[point_fields.index(id_field)])] = record
+            # end for
+        # end for
+        # polygons that were deleted since the last run
+        deleted_keys = set(known_hashes) - set(current_hashes)
+        log_msg += 'Found {} new or changed and {} deleted polygons since the last run\n'.format(len(changed_records),len(deleted_keys))
 
-    # Create PIN field
-    arcpy.AddField_management(point_layer,'NAME','TEXT')
-    # add message
-    log_msg += '\nAdded NAME field\n'
+        # update or delete existing points
+        update_count = 0
+        delete_count = 0
+        # every new or changed polygon is looked up, not only the ones in the hash file, since points
+        # inserted by a run that failed before saving the hash file are already in the points layer
+        existing_keys = list(changed_records) + list(deleted_keys)
+        updated_keys = set()
+        for where_clause in id_where_clauses(point_layer, id_field, existing_keys):
+            with arcpy.da.UpdateCursor(point_layer, point_fields, where_clause) as cursor:
+                for row in cursor:
+                    key = u'{}'.format(row[point_fields.index(id_field)])
+                    if key in deleted_keys or key in updated_keys:
+                        # deleted polygons, and any extra copies of a point that was already updated
+                        cursor.deleteRow()
+                        delete_count += 1
+                    elif key in changed_records:
+                        # points are updated once, anything left in changed_records is inserted
+                        cursor.updateRow(list(changed_records.pop(key)))
+                        updated_keys.add(key)
+                        update_count += 1
+                # end for
+            # end with
+        # end for
 
-    # Create location field
-    arcpy.AddField_management(addPts,'FACILITY_ID','SHORT')
-    # add message
-    log_msg += '\nAdded FACILITY_ID field\n'
+        # insert new points
+        with arcpy.da.InsertCursor(point_layer, point_fields) as cursor:
+            for record in changed_records.values():
+                cursor.insertRow(record)
+            # end for
+        # end with
+        log_msg += '\nUpdated {}, deleted {} and inserted {} records in points layer using the {} centroid engine\n'.format(update_count,delete_count,len(changed_records),centroid_engine)
+    else:
+        # 1. Create a shell feature class for point layer
+        # projected or geographic coordinate system for feature class
+        sr = arcpy.SpatialReference(0000)
 
-    # create City field
-    arcpy.AddField_management(addPts,'ADDRESS','TEXT')
-    # add message
-    log_msg += '\nAdded ADDRESS field\n'
+        # create feature class
+        arcpy.CreateFeatureclass_management(output_location,fc_name,'POINT',spatial_reference=sr)
+        # add message
+         # update message as desired
+        log_msg += 'Created empty feature class for Points Layer\n'
 
-    # 4. Loop through features_list and add records to Point layer
-    # Point layer fields
-    # 'SHAPE@XY' defines where the point is located
-    # the other fields should match what was created in step #3 and the fields from the polygon layer
-    point_fields = ['SHAPE@XY', 'NAME', 'FACILITY_ID', 'ADDRESS']
+        # 2. Add fields to Point layer
+        # These fields should match the fields from the polygon_fields variable with the
+        # exception of the first (centroid) field
 
-    # Create an Insert Cursor on the Point layer and add records from features_list
-    with arcpy.da.InsertCursor(point_layer,point_fields) as cursor:
-        for record in features_list:
-            cursor.insertRow(record)
-        # end for
-    # end with
+        # Create PIN field
+        arcpy.AddField_management(point_layer,'NAME','TEXT')
+        # add message
+        log_msg += '\nAdded NAME field\n'
+
+        # Create location field
+        arcpy.AddField_management(point_layer,'FACILITY_ID','SHORT')
+        # add message
+        log_msg += '\nAdded FACILITY_ID field\n'
+
+        # create City field
+        arcpy.AddField_management(point_layer,'ADDRESS','TEXT')
+        # add message
+        log_msg += '\nAdded ADDRESS field\n'
+
+        # 3. Stream features from polygon layer to Point layer
+        # the polygon layer is read in batches in this thread, and each batch is passed through a queue
+        # to a writer thread that inserts it into the Point layer, so reading and writing overlap
+        # and only a few batches are held in memory at a time
+
+        # start the writer thread
+        point_queue = Queue.Queue(queue_size)
+        writer_status = {'count': 0, 'error': None}
+        writer = threading.Thread(target=write_points, args=(point_layer, point_fields, point_queue, writer_status))
+        writer.daemon = True
+        writer.start()
+        try:
+            for batch in read_centroid_batches(polygon_layer, polygon_fields, centroid_engine, batch_size, id_field, current_hashes, None, point_location == 'INTERIOR', interior_precision, centroid_counts):
+                # wait for room in the queue, but stop reading if the writer has failed
+                while True:
+                    try:
+                        point_queue.put(batch, timeout=1)
+                        break
+                    except Queue.Full:
+                        if not writer.is_alive():
+                            break
+                # end while
+                if not writer.is_alive():
+                    break
+            # end for
+        finally:
+            # tell the writer there are no more batches, and wait for it to finish
+            while writer.is_alive():
+                try:
+                    point_queue.put(None, timeout=1)
+                    break
+                except Queue.Full:
+                    pass
+            # end while
+            writer.join()
+        # end try
+        # raise the error that stopped the writer
+        if writer_status['error'] is not None:
+            raise writer_status['error']
+
+        # add message
+        log_msg += '\nCompleted adding {} records to points layer using the {} centroid engine\n'.format(writer_status['count'],centroid_engine)
+    # end if
+    if point_location == 'INTERIOR' and centroid_engine == 'NUMPY':
+        # add message
+        log_msg += '\nMoved {} centroids that were outside their polygon to an interior point\n'.format(centroid_counts['moved'])
+
+    # save the polygon hashes for the next run, now that the point layer matches them
+    if incremental:
+        with open(hash_file + '.tmp', 'w') as f:
+            json.dump(current_hashes, f)
+        if os.path.exists(hash_file):
+            os.remove(hash_file)
+        os.rename(hash_file + '.tmp', hash_file)
+        log_msg += '\nSaved hashes of {} polygons to {}\n'.format(len(current_hashes),hash_file)
 
     # Get the end time of the geoprocessing tool(s)
     finish_time = time.clock()
@@ -128,7 +334,6 @@ try:
     elapsed_time_minutes = round((elapsed_time_seconds / 60),2)
 
     # add message
-    log_msg += '\nCompleted adding records to points layer\n'
     log_msg += '\nCompleted script in {} seconds on {}'.format(elapsed_time_seconds,date_today)
     # of if you want minutes, use this line instead
     log_msg += '\nCompleted script in {} minutes on {}'.format(elapsed_time_minutes,date_today)
@@ -15,8 +15,8 @@
 # You must update the following paramaters:
 # 1. file path to the log file that reports whether the tool ran successfully or unsuccessfully.
 # 2. SDE connection to parent geodatabase
-# 3. file path to the child file geodatabase
-# 4. name of the replication you are performing synchronize changes on
+# 3. list of the replications you are performing synchronize changes on, and the file path to the child file geodatabase of each
+# 4. number of replications to synchronize at the same time
 #
 # Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
 # WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
@@ -27,76 +27,183 @@
 # ---------------------------------------------------------------------------------------------------------------------------------------------------
 
 # Import system modules
-import arcpy, sys, time, datetime
+import arcpy, sys, os, time, datetime, itertools, multiprocessing
+# note the imported "wait_for_result" helper module that is located within this "ArcPy" repo
+import wait_for_result
 
-# Try to run Replication
-try:
-    # Time stamp variables
-    currentTime = datetime.datetime.now()
-    # Date formatted as month-day-year (1-1-2017)
-    dateToday = currentTime.strftime("%m-%d-%Y")
-    # Date formated as month-day-year-hours-minutes-seconds
-    dateTodayTime = currentTime.strftime("%m-%d-%Y-%H-%M-%S")
+# Returns the number of rows in each dataset of a replica in the child geodatabase
+# counts from before and after a synchronize give the net row change of each dataset (inserts minus deletes),
+# which does not show updates, or inserts balanced by deletes
+# datasets that are not found in the child geodatabase are left out
+def count_replica_rows(child_gdb, replica_name):
+    counts = {}
+    for replica in arcpy.da.ListReplicas(child_gdb):
+        # replica names can be qualified with the owner, e.g. DBO.Name of Replication
+        if replica.name.lower() == replica_name.lower() or replica.name.lower().endswith('.' + replica_name.lower()):
+            for dataset in replica.datasets:
+                dataset_path = os.path.join(child_gdb, dataset.split('.')[-1])
+                if arcpy.Exists(dataset_path):
+                    counts[dataset] = int(arcpy.GetCount_management(dataset_path).getOutput(0))
+            # end for
+    # end for
+    return counts
+# end count_replica_rows()
 
-    # Create text file for logging results of script
-    # Update file path with your parameters
-    # Each time the script runs, it creates a new text file with the date1 variable as part of the file name
-    # The example would be GeoprocessingReport_1-1-2017
-    logFile = r'C:\GIS\Results\GeoprocessingReport_{}.txt'.format(dateToday)
+# Synchronizes each replica of one child geodatabase, one after the other
+# replicas that share a child geodatabase cannot be synchronized at the same time, so each child gets one job
+# job is [parent SDE connection, child geodatabase, list of replica names]
+# returns a list of (replica name, child geodatabase, seconds, tool messages, {dataset: net row change}, error message or None)
+def sync_child(job):
+    sde, child_gdb, replica_names = job
+    results = []
+    for replica_name in replica_names:
+        # get time stamp for start of tool
+        start_time = time.time()
+        try:
+            # row counts before synchronizing
+            before_counts = count_replica_rows(child_gdb, replica_name)
 
-    # variable to store messages for log file. Messages written in finally statement at end of script
-    logMsg = ''
+            # Process: Synchronize Changes
+            # Replicates data from parent to child geodatabase
+            result = arcpy.SynchronizeChanges_management(sde, replica_name, child_gdb, "FROM_GEODATABASE1_TO_2", "IN_FAVOR_OF_GDB1", "BY_OBJECT", "DO_NOT_RECONCILE")
 
-    # get time stamp for start of tool
-    starttime = time.clock()
+            # the tool returns once it has finished, so this raises an error if it failed, and gets the time it took
+            # a tool that hangs is stopped by run_timeout
+            status, elapsed_time = wait_for_result.wait_for_result(result, start_time=start_time)
+            # store tool result message in a variable
+            result_value = result.getMessages()
 
-    # SDE is parent geodatabase in replication
-    # Change this to your SDE connection
-    sde = r"SDE Connection"
-    # Child file geodatabase in replication
-    # Change this to your file geodatabase
-    child_gdb = r"\\path\to\file.gdb"
+            # net row change of each dataset
+            after_counts = count_replica_rows(child_gdb, replica_name)
+            row_changes = dict((dataset, after_counts[dataset] - before_counts.get(dataset, 0)) for dataset in after_counts)
+            results.append((replica_name, child_gdb, elapsed_time, result_value, row_changes, None))
+        except Exception as e:
+            tbE = sys.exc_info()[2]
+            results.append((replica_name, child_gdb, time.time() - start_time, '', {}, 'Failed at Line {}. Error: {}'.format(tbE.tb_lineno, e)))
+    # end for
+    return results
+# end sync_child()
 
-    # Process: Synchronize Changes
-    # Replicates data from parent to child geodatabase
-    # update the name of the replication
-    result = arcpy.SynchronizeChanges_management(sde, "Name of Replication", child_gdb, "FROM_GEODATABASE1_TO_2", "IN_FAVOR_OF_GDB1", "BY_OBJECT", "DO_NOT_RECONCILE")
+# replicas are synchronized in worker processes, so the script only runs in the main process
+if __name__ == '__main__':
+    # Try to run Replication
+    try:
+        # Time stamp variables
+        currentTime = datetime.datetime.now()
+        # Date formatted as month-day-year (1-1-2017)
+        dateToday = currentTime.strftime("%m-%d-%Y")
+        # Date formated as month-day-year-hours-minutes-seconds
+        dateTodayTime = currentTime.strftime("%m-%d-%Y-%H-%M-%S")
 
-    # Get the end time of the geoprocessing tool(s)
-    finishtime = time.clock()
-    # Get the total time to run the geoprocessing tool(s)
-    elapsedtime = finishtime - starttime
+        # Create text file for logging results of script
+        # Update file path with your parameters
+        # Each time the script runs, it creates a new text file with the date1 variable as part of the file name
+        # The example would be GeoprocessingReport_1-1-2017
+        logFile = r'C:\GIS\Results\GeoprocessingReport_{}.txt'.format(dateToday)
 
-    # write result messages to log
-    # delay writing results until geoprocessing tool gets the completed code
-    while result.status < 4:
-        time.sleep(0.2)
-    # store tool result message in a variable
-    resultValue = result.getMessages()
-    # add the tool's message to the log message
-    logMsg += "completed {}\n".format(str(resultValue))
-    # add a more human readable message to log message
-    logMsg += "\nSuccessfully ran replication from {} to {} in {} seconds on {}\n".format(sde, child_gdb, str(elapsedtime), dateToday)
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # add the error message to the log message
-    logMsg += "\nError: {}\n".format(str(e))
-# handle exception error
-except Exception as e:
-    # Store information about the error
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # add the error message to the log message
-    logMsg += "\nError: {}\n".format(e.message)
-finally:
-    # write message to log file
-    try:
-        with open(logFile, 'w') as f:
-            f.write(str(logMsg))
-    except:
-        pass
\ No newline at end of file
+        # variable to store messages for log file. Messages written in finally statement at end of script
+        logMsg = ''
+
+        # get time stamp for start of tool
+        starttime = time.time()
+
+        # SDE is parent geodatabase in replication
+        # Change this to your SDE connection
+        sde = r"SDE Connection"
+        # Replications to synchronize, and the child file geodatabase of each
+        # Change these to your replications and file geodatabases
+        replicas = [["Name of Replication", r"\\path\to\file.gdb"], ["Name of Replication", r"\\path\to\file.gdb"]]
+        # number of child geodatabases synchronized at the same time
+        # replicas that share a child geodatabase are always synchronized one after the other
+        max_concurrent = 4
+        # seconds to wait for all replications before stopping the ones that have not finished, None waits forever
+        # the Synchronize Changes tool cannot be cancelled, so the replications run in worker processes that are
+        # stopped when this time is up, even when max_concurrent is 1
+        run_timeout = 4 * 3600
+
+        # group the replicas by child geodatabase, keeping the order of the list
+        children = []
+        child_replicas = {}
+        for replica_name, child_gdb in replicas:
+            child_key = os.path.normcase(os.path.abspath(child_gdb))
+            if child_key not in child_replicas:
+                children.append(child_key)
+                child_replicas[child_key] = [child_gdb, []]
+            child_replicas[child_key][1].append(replica_name)
+        # end for
+        jobs = [[sde, child_replicas[child_key][0], child_replicas[child_key][1]] for child_key in children]
+
+        # Process: Synchronize Changes
+        pool = None
+        try:
+            if run_timeout is not None or (max_concurrent > 1 and len(jobs) > 1):
+                pool = multiprocessing.Pool(max(1, min(max_concurrent, len(jobs))))
+                job_results = pool.imap_unordered(sync_child, jobs)
+            else:
+                job_results = itertools.imap(sync_child, jobs)
+            # add messages for each child geodatabase as it finishes
+            succeeded_replicas = 0
+            failed_replicas = 0
+            finished_children = 0
+            # child geodatabases that have not finished, by the order of jobs
+            unfinished_children = [job[1] for job in jobs]
+            while finished_children < len(jobs):
+                if pool is not None and run_timeout is not None:
+                    try:
+                        results = job_results.next(max(run_timeout - (time.time() - starttime), 0))
+                    except multiprocessing.TimeoutError:
+                        # the remaining replications are stopped when the pool is terminated, which can leave
+                        # a child geodatabase locked or partly synchronized, so list them to be checked
+                        logMsg += "\nStopped {} child geodatabases that did not finish synchronizing within {} seconds; check these child geodatabases: {}\n".format(len(jobs) - finished_children, run_timeout, ', '.join(unfinished_children))
+                        failed_replicas = len(replicas) - succeeded_replicas
+                        break
+                else:
+                    results = next(job_results)
+                finished_children += 1
+                if results:
+                    unfinished_children.remove(results[0][1])
+                for replica_name, child_gdb, elapsedtime, resultValue, row_changes, error in results:
+                    if error:
+                        failed_replicas += 1
+                        logMsg += "\nReplication {} from {} to {} {} after {} seconds\n".format(replica_name, sde, child_gdb, error, round(elapsedtime, 2))
+                        continue
+                    succeeded_replicas += 1
+                    # add the tool's message to the log message
+                    logMsg += "completed {}\n".format(str(resultValue))
+                    # net change in row count, and the datasets that changed
+                    changed_datasets = ', '.join('{} {:+d}'.format(dataset, change) for dataset, change in sorted(row_changes.items()) if change)
+                    # add a more human readable message to log message
+                    logMsg += "\nSuccessfully ran replication {} from {} to {} in {} seconds on {} (net row change {:+d}{})\n".format(replica_name, sde, child_gdb, round(elapsedtime, 2), dateToday, sum(row_changes.values()), ': ' + changed_datasets if changed_datasets else '')
+                # end for
+            # end while
+        finally:
+            if pool is not None:
+                pool.terminate()
+        # end try
+
+        # Get the total time to run the geoprocessing tool(s)
+        elapsedtime = time.time() - starttime
+        logMsg += "\nCompleted {} of {} replications ({} failed) in {} seconds\n".format(succeeded_replicas, len(replicas), failed_replicas, round(elapsedtime, 2))
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # add the error message to the log message
+        logMsg += "\nError: {}\n".format(str(e))
+    # handle exception error
+    except Exception as e:
+        # Store information about the error
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # add the error message to the log message
+        logMsg += "\nError: {}\n".format(e.message)
+    finally:
+        # write message to log file
+        try:
+            with open(logFile, 'w') as f:
+                f.write(str(logMsg))
+        except:
+            pass
\ No newline at end of file
@@ -4,94 +4,196 @@
 # connections to the database are closed, and all users are disconnected
 # before running tools.  database connections are opened at the end
 
+# the feature classes and tables are kept in a catalog file between runs, so only
+# datasets added since the last run have to be described and counted
+
 # import modules
 import arcpy
 import os
 import sys
 import datetime
 import time
+import json
+import itertools
+import multiprocessing
+
+# Lists the feature classes and tables of the geodatabase, or the feature classes and other datasets of one feature dataset
+# datasets that are in the catalog keep their catalog entry (type and row count), so only new datasets are described and counted
+# job is [geodatabase, feature dataset name ('' for the geodatabase itself), True to count the rows of each feature class and table,
+#         {name: catalog entry} of the datasets in the catalog for this workspace]
+# returns (feature dataset name, list of {"name", "type", "dataset", "row_count"} catalog entries, error message or None)
+def list_workspace(job):
+    dbase, dataset, count_rows, known_entries = job
+    try:
+        arcpy.env.workspace = os.path.join(dbase, dataset) if dataset else dbase
+        names = [(name, "FeatureClass") for name in arcpy.ListFeatureClasses()]
+        if dataset:
+            # topologies, network datasets and other datasets in the feature dataset, whose type is found with Describe
+            names += [(name, None) for name in arcpy.ListDatasets()]
+        else:
+            names += [(name, "Table") for name in arcpy.ListTables()]
+        entries = []
+        for name, dataset_type in names:
+            entry = known_entries.get(name)
+            if entry is None:
+                entry = {"name": name, "type": dataset_type or arcpy.Describe(name).datasetType, "dataset": dataset, "row_count": None}
+            else:
+                entry = dict(entry)
+            if entry["row_count"] is None and count_rows and entry["type"] in ("FeatureClass", "Table"):
+                entry["row_count"] = int(arcpy.GetCount_management(name).getOutput(0))
+            entries.append(entry)
+        # end for
+        return dataset, entries, None
+    except Exception as e:
+        tbE = sys.exc_info()[2]
+        return dataset, [], 'Failed at Line {}. Error: {}'.format(tbE.tb_lineno, e)
+# end list_workspace()
+
+# feature datasets are listed in worker processes, so the script only runs in the main process
+if __name__ == '__main__':
+    # capture the date the script is being run
+    date_today = datetime.date.today()
+    # convert date format to month-day-year (1-1-2020)
+    formatted_date_today = date_today.strftime("%m-%d-%Y")
+    # placeholder for messages for text file
+    log_message = ''
+    # text file to write messages to
+    # TODO: update path
+    log_file = r'C:\GIS\Results\Database_Maint_Report_{}.txt'.format(date_today)
 
-# capture the date the script is being run
-date_today = datetime.date.today()
-# convert date format to month-day-year (1-1-2020)
-formatted_date_today = date_today.strftime("%m-%d-%Y")
-# placeholder for messages for text file
-log_message = ''
-# text file to write messages to
-# TODO: update path
-log_file = r'C:\GIS\Results\Database_Maint_Report_{}.txt'.format(date_today)
-
-try:
-    # database connection
-    # TODO: update path for sde connection
-    dbase = r"SDE Connection"
-    # set workspace to geodatabase
-    arcpy.env.workspace = dbase
-    # get list of all:
-    # > feature classes
-    feature_classes = arcpy.ListFeatureClasses()
-    # > tables
-    tables = arcpy.ListTables()
-    # list of data to run tools on
-    data_list = feature_classes + tables
-    # Next, for feature datasets get all of the datasets and featureclasses
-    # from the list and add them to the master list.
-    for dataset in arcpy.ListDatasets("", "Feature"):
-        arcpy.env.workspace = os.path.join(dbase, dataset)
-        data_list += arcpy.ListFeatureClasses() + arcpy.ListDatasets()
-    # add message
-    log_message += '{} : Created list of feature classes and tables in geodatabase\n'.format(time.strftime('%I:%M%p'))
-
-    # close database from accepting connections
-    arcpy.AcceptConnections(dbase, False)
-    # remove existing users
-    arcpy.DisconnectUser(dbase, 'ALL')
-    # add message
-    log_message += '\n{} : Disconnected users and closed connections to the geodatabase\n'.format(time.strftime('%I:%M%p'))
-
-    # run analyze datasets
-    arcpy.AnalyzeDatasets_management(dbase, 'SYSTEM', data_list, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
-    # add message
-    log_message += '\n{} : Ran "Analyze Datasets" tool\n'.format(time.strftime('%I:%M%p'))
-
-    # run rebuild indexes
-    arcpy.RebuildIndexes_management(dbase, 'SYSTEM', data_list, 'ALL')
-    # add message
-    log_message += '\n{} : Ran "Rebuild Indexes" tool\n'.format(time.strftime('%I:%M%p'))
-
-    # run compress
-    arcpy.Compress_management(dbase)
-     # add message
-    log_message += '\n{} : Ran "Compress" tool\n'.format(time.strftime('%I:%M%p'))
-
-    # run analyze datasets
-    arcpy.AnalyzeDatasets_management(dbase, 'SYSTEM', data_list, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
-    # add message
-    log_message += '\n{} : Ran "Analyze Datasets" tool\n'.format(time.strftime('%I:%M%p'))
-
-    # run rebuild indexes
-    arcpy.RebuildIndexes_management(dbase, 'SYSTEM', data_list, 'ALL')
-     # add message
-    log_message += '\n{} : Ran "Rebuild Indexes" tool\n'.format(time.strftime('%I:%M%p'))
-
-    # allow database to accept connections
-    arcpy.AcceptConnections(dbase, True)
-# If an error occurs running geoprocessing tool(s) capture error and write message
-except (Exception, EnvironmentError) as e:
-    tbE = sys.exc_info()[2]
-    # Write the line number the error occured to the log file
-    log_message += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # Write the error message to the log file
-    log_message += "Error: {}".format(str(e))
-finally:
-    # write message to log file
     try:
+        # database connection
+        # TODO: update path for sde connection
+        dbase = r"SDE Connection"
+
+        # json file with the catalog of feature classes and tables in the geodatabase (name, type, feature dataset and row count)
+        # TODO: update path
+        catalog_file = r'C:\GIS\Results\Database_Catalog.json'
+        # every run lists the geodatabase and each feature dataset (on the worker processes), so datasets that were added or
+        # removed are always found, but only datasets that are not in the catalog are described and counted
+        # days before the types and row counts of every dataset are read again
+        catalog_max_age_days = 7
+        # when True, the types and row counts of every dataset are read again, however old the catalog is
+        force_full_refresh = False
+        # when True, the rows of each feature class and table are counted when it is added to the catalog,
+        # and at each full refresh; the counts are the last-known row counts between refreshes
+        count_rows = True
+        # number of workspaces (the geodatabase and its feature datasets) listed at the same time
+        list_processes = 4
+
+        # catalog from the last run
+        catalog = None
+        if os.path.exists(catalog_file):
+            with open(catalog_file) as f:
+                catalog = json.load(f)
+        # end if
+        # read every dataset again when there is no catalog for the geodatabase, or it is too old
+        full_refresh = force_full_refresh or catalog is None or catalog.get("workspace") != dbase or time.time() - catalog.get("refreshed", 0) > catalog_max_age_days * 86400
+
+        # feature datasets in the geodatabase
+        arcpy.env.workspace = dbase
+        feature_datasets = arcpy.ListDatasets("", "Feature")
+
+        # catalog entries of each workspace ('' for the geodatabase itself), by dataset name
+        known_entries = {}
+        if not full_refresh:
+            for entry in catalog["entries"]:
+                known_entries.setdefault(entry["dataset"], {})[entry["name"]] = entry
+            # end for
+        # end if
+        # list the geodatabase itself, and every feature dataset
+        # datasets that no longer exist are not listed, so they are dropped from the catalog
+        jobs = [[dbase, '', count_rows, known_entries.get('', {})]] + [[dbase, dataset, count_rows, known_entries.get(dataset, {})] for dataset in feature_datasets]
+        entries = []
+
+        # list the geodatabase and feature datasets, more than one at a time
+        pool = None
+        try:
+            if list_processes > 1 and len(jobs) > 1:
+                pool = multiprocessing.Pool(min(list_processes, len(jobs)))
+                job_results = pool.imap(list_workspace, jobs)
+            else:
+                job_results = itertools.imap(list_workspace, jobs)
+            for dataset, dataset_entries, error in job_results:
+                if error:
+                    raise RuntimeError('Could not list {}. {}'.format(dataset or dbase, error))
+                entries += dataset_entries
+            # end for
+        finally:
+            if pool is not None:
+                pool.terminate()
+        # end try
+
+        # save the catalog for the next run
+        # written to a temporary file first, so an error does not leave a partial file
+        catalog = {
+            "workspace": dbase,
+            "refreshed": time.time() if full_refresh else catalog["refreshed"],
+            "feature_datasets": feature_datasets,
+            "entries": entries
+        }
+        with open(catalog_file + '.tmp', 'w') as f:
+            json.dump(catalog, f, indent=2)
+        if os.path.exists(catalog_file):
+            os.remove(catalog_file)
+        os.rename(catalog_file + '.tmp', catalog_file)
+
+        # list of data to run tools on
+        data_list = [entry["name"] for entry in entries]
+        # add message
+        new_entries = len([entry for entry in entries if entry["name"] not in known_entries.get(entry["dataset"], {})])
+        log_message += '{} : Created list of {} feature classes and tables in {} feature datasets and the geodatabase ({}, {} read from the catalog)\n'.format(time.strftime('%I:%M%p'), len(data_list), len(feature_datasets), 'full refresh' if full_refresh else 'catalog', len(data_list) - new_entries)
+
+        # close database from accepting connections
+        arcpy.AcceptConnections(dbase, False)
+        # remove existing users
+        arcpy.DisconnectUser(dbase, 'ALL')
+        # add message
+        log_message += '\n{} : Disconnected users and closed connections to the geodatabase\n'.format(time.strftime('%I:%M%p'))
+
+        # run analyze datasets
+        arcpy.AnalyzeDatasets_management(dbase, 'SYSTEM', data_list, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
+        # add message
+        log_message += '\n{} : Ran "Analyze Datasets" tool\n'.format(time.strftime('%I:%M%p'))
+
+        # run rebuild indexes
+        arcpy.RebuildIndexes_management(dbase, 'SYSTEM', data_list, 'ALL')
+        # add message
+        log_message += '\n{} : Ran "Rebuild Indexes" tool\n'.format(time.strftime('%I:%M%p'))
+
+        # run compress
+        arcpy.Compress_management(dbase)
+         # add message
+        log_message += '\n{} : Ran "Compress" tool\n'.format(time.strftime('%I:%M%p'))
+
+        # run analyze datasets
+        arcpy.AnalyzeDatasets_management(dbase, 'SYSTEM', data_list, 'ANALYZE_BASE', 'ANALYZE_DELTA', 'ANALYZE_ARCHIVE')
+        # add message
+        log_message += '\n{} : Ran "Analyze Datasets" tool\n'.format(time.strftime('%I:%M%p'))
+
+        # run rebuild indexes
+        arcpy.RebuildIndexes_management(dbase, 'SYSTEM', data_list, 'ALL')
+         # add message
+        log_message += '\n{} : Ran "Rebuild Indexes" tool\n'.format(time.strftime('%I:%M%p'))
+
         # allow database to accept connections
         arcpy.AcceptConnections(dbase, True)
-         # add message
-        log_message += '\n{} : Opened connections to the geodatabase\n'.format(time.strftime('%I:%M%p'))
-        # write messages to text file
-        with open(log_file, 'w') as f:
-            f.write(str(log_message))
-    except:
-        pass
\ No newline at end of file
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    except (Exception, EnvironmentError) as e:
+        tbE = sys.exc_info()[2]
+        # Write the line number the error occured to the log file
+        log_message += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # Write the error message to the log file
+        log_message += "Error: {}".format(str(e))
+    finally:
+        # write message to log file
+        try:
+            # allow database to accept connections
+            arcpy.AcceptConnections(dbase, True)
+             # add message
+            log_message += '\n{} : Opened connections to the geodatabase\n'.format(time.strftime('%I:%M%p'))
+            # write messages to text file
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
\ No newline at end of file
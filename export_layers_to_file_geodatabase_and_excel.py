@@ -21,113 +21,340 @@
 # herein. The user assumes the risk that the information may not be accurate.
 #-------------------------------------------------------------------------------
 
-import arcpy, datetime, sys, os
-
+import arcpy, datetime, sys, os, time, itertools, multiprocessing, numpy
+# note the imported "xlsx_writer" helper module that is located within this "ArcPy" repo
+import xlsx_writer
+# pyarrow is only needed for the Parquet export, and is not installed with ArcGIS
 try:
-    # Time stamp variables
-    currentTime = datetime.datetime.now()
-    # Date formatted as month-day-year (1-1-2017)
-    dateToday = currentTime.strftime("%m-%d-%Y")
-    # date for file geodatabase name
-    dateGdb = currentTime.strftime("%m%d%Y")
-
-    # Create text file for logging results of script
-    # update this variable
-    log_file = r'[path]\[to]\[location]\Report File Name {}.txt'.format(dateToday)
-    # variable to store messages for log file. Messages written in finally statement at end of script
-    logMsg = ''
-
-    # sde database connection
-    # update this variable
-    sde = r'Database Connections\[SDE Database Name].sde'
-    # layers
-    # update this variable
-    layers = [[os.path.join(sde, r'Name of Layer'), 'Name of Layer'], [os.path.join(sde, r'Name of Layer'), 'Name of Layer'], [os.path.join(sde, r'Name of Layer'), 'Name of Layer']]
-
-    # 1. create new directory
-    # parent directory
-    # update this variable
-    parent_dir = r'[path]\[to]\[location]'
-    # output directory
-    out_dir = r'{}\{}'.format(parent_dir,dateGdb)
-    # create sub-directory with current date
-    os.mkdir(out_dir)
-    # add message
-    logMsg += '\nCreated directory "{}" in {}\n'.format(dateGdb,out_dir)
-
-    # 2. create file geodatabase
-    # parameters
-    # update this variable
-    out_gdb_name = r'Name_of_Geodatabase_{}'.format(dateGdb)
-    out_gdb = os.path.join(out_dir, '{}.gdb'.format(out_gdb_name))
-    # geoprocessing
-    arcpy.CreateFileGDB_management(out_dir,out_gdb_name,'10.0')
-    # add message
-    logMsg += '\nCreated file geodatabase "{}" in directory "{}"\n'.format(out_gdb_name, out_dir)
-
-    # 3. Export layers to file geodatabase
-    for fc in layers:
-        # export feature class
-        arcpy.FeatureClassToFeatureClass_conversion(fc[0],out_gdb,fc[1])
-        # add message
-        logMsg += '\nCopied {} layer to {}\n'.format(fc[1],out_gdb)
-    # end for
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# lock shared by the worker processes so only one of them exports to the file geodatabase at a time
+export_lock = None
 
-    # 4. update Latitude Longitude fields in feature classes
-    # export feature class to excel
-    # set workspace for listing function
-    arcpy.env.workspace = out_gdb
-    # create list of feature classes in file geodatabase
-    datasets = arcpy.ListFeatureClasses()
-    # fields for update
-    # update this variable
-    # these are examples
-    fc_fields = ['SHAPE@XY', 'LON', 'LAT']
-    # loop through feature classes
-    for fc in datasets:
-        # create update cursor
-        with arcpy.da.UpdateCursor(fc, fc_fields) as cursor:
+# Sets up each worker process with the shared export lock
+def init_worker(lock):
+    global export_lock
+    export_lock = lock
+# end init_worker()
+
+# null values used to read integer fields, which cannot hold NaN (the smallest value of each field type)
+integer_nulls = {'SmallInteger': -32768, 'Integer': -2147483648}
+
+# Returns which stored field values differ from the coordinates they should hold
+# stored is the array of field values (integer fields with the smallest value of their type for nulls), coordinates the array of doubles
+# values are compared as the field stores them: doubles exactly, singles after rounding the coordinate to a single,
+# and integers within 1, since the coordinate is rounded to a whole number; text fields are always different
+def stored_differs(stored, coordinates):
+    if stored.dtype.kind == 'f':
+        values = stored.astype('f8')
+        coordinates = coordinates.astype(stored.dtype).astype('f8')
+        # two nulls (NaN) are the same
+        return (values != coordinates) & ~(numpy.isnan(values) & numpy.isnan(coordinates))
+    if stored.dtype.kind in 'iu':
+        is_null = stored == numpy.iinfo(stored.dtype).min
+        # null coordinates (NaN) are compared below
+        with numpy.errstate(invalid='ignore'):
+            differs = ~(numpy.abs(stored.astype('f8') - coordinates) < 1)
+        return numpy.where(is_null | numpy.isnan(coordinates), is_null != numpy.isnan(coordinates), differs)
+    return numpy.ones(len(stored), bool)
+# end stored_differs()
+
+# Updates the longitude and latitude fields of a feature class from its point geometry, only writing the rows that change
+# fc_fields are ['SHAPE@XY', longitude field, latitude field]
+# the coordinates and current field values of every row are read into arrays and compared at once (see stored_differs()),
+# then an Update Cursor visits only the rows whose values are different
+# returns (number of rows updated, number of rows)
+def update_coordinates_bulk(fc, fc_fields, chunk_size=1000):
+    lon_field, lat_field = fc_fields[1], fc_fields[2]
+    field_types = dict((field.name.lower(), field.type) for field in arcpy.ListFields(fc))
+    # nulls are read as NaN, except in integer fields
+    null_values = {'SHAPE@X': numpy.nan, 'SHAPE@Y': numpy.nan}
+    for field_name in (lon_field, lat_field):
+        null_values[field_name] = integer_nulls.get(field_types.get(field_name.lower()), numpy.nan)
+    # end for
+    values = arcpy.da.FeatureClassToNumPyArray(fc, ['OID@', 'SHAPE@X', 'SHAPE@Y', lon_field, lat_field], null_value=null_values)
+    x = values['SHAPE@X'].astype('f8')
+    y = values['SHAPE@Y'].astype('f8')
+    # rows where either value differs
+    changed = stored_differs(values[lon_field], x) | stored_differs(values[lat_field], y)
+    changed_oids = values['OID@'][changed]
+    if not len(changed_oids):
+        return 0, len(values)
+    if len(changed_oids) > len(values) / 2:
+        # most rows changed, so visit every row and skip the unchanged ones
+        where_clauses = [None]
+    else:
+        oid_field = arcpy.AddFieldDelimiters(fc, arcpy.Describe(fc).OIDFieldName)
+        where_clauses = ['{} IN ({})'.format(oid_field, ','.join(str(oid) for oid in changed_oids[start:start + chunk_size])) for start in range(0, len(changed_oids), chunk_size)]
+    changed_oids = set(changed_oids.tolist())
+    for where_clause in where_clauses:
+        with arcpy.da.UpdateCursor(fc, ['OID@'] + fc_fields, where_clause) as cursor:
             for row in cursor:
-                # longitude
-                row[1] = row[0][0]
-                # latitude
-                row[2] = row[0][1]
-                # update record
-                cursor.updateRow(row)
+                if row[0] in changed_oids:
+                    # longitude
+                    row[2] = row[1][0] if row[1] else None
+                    # latitude
+                    row[3] = row[1][1] if row[1] else None
+                    # update record
+                    cursor.updateRow(row)
             # end for
-            # update your message
-            logMsg += '\nCompleted updating Latitude and Longitude records for "{}" layer\n'.format(fc)
         # end cursor
-        # convert to Excel
-        arcpy.TableToExcel_conversion(fc,os.path.join(out_dir,'{}.xls'.format(fc)),"ALIAS")
-        # add message
-        logMsg += '\nExported {} layer to Microsof Excel format\n'.format(fc)
     # end for
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # add the error message to the log message
-    logMsg += "\nError: {}\n".format(str(e))
-# handle exception error
-except Exception as e:
-    # Store information about the error
-    tbE = sys.exc_info()[2]
-    # add the line number the error occured to the log message
-    logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # add the error message to the log message
-    logMsg += "\nError: {}\n".format(e.message)
-finally:
+    return len(changed_oids), len(values)
+# end update_coordinates_bulk()
+
+# Exports the attributes of a feature class to an .xlsx workbook, one row at a time
+# column headings are the field aliases, like the "ALIAS" option of Table To Excel
+# geometry, blob and raster fields are left out
+# returns the number of rows written
+def export_to_xlsx(fc, xlsx_path):
+    fields = [field for field in arcpy.ListFields(fc) if field.type not in ('Geometry', 'Blob', 'Raster')]
+    with xlsx_writer.XlsxWriter(xlsx_path, os.path.basename(fc), [field.aliasName or field.name for field in fields]) as workbook:
+        with arcpy.da.SearchCursor(fc, [field.name for field in fields]) as cursor:
+            for row in cursor:
+                workbook.write_row(row)
+            # end for
+        # end cursor
+    # end with
+    return workbook.row_count
+# end export_to_xlsx()
+
+# Exports the attributes and geometry (as WKB) of a feature class to a Parquet file
+# rows are read from a Search Cursor and written in row groups of batch_size rows, so only one row group is held in memory
+# geometry is written to a binary 'geometry' column, with GeoParquet metadata so it can be read by e.g. geopandas
+# blob and raster fields are left out
+# returns the number of rows written
+def export_to_parquet(fc, parquet_path, batch_size=100000):
+    # Arrow type for each field type
+    arrow_types = {
+        'OID': pyarrow.int32(),
+        'Integer': pyarrow.int32(),
+        'SmallInteger': pyarrow.int16(),
+        'Double': pyarrow.float64(),
+        'Single': pyarrow.float32(),
+        'String': pyarrow.string(),
+        'Guid': pyarrow.string(),
+        'GlobalID': pyarrow.string(),
+        'Date': pyarrow.timestamp('ms')
+    }
+    all_fields = arcpy.ListFields(fc)
+    fields = [field for field in all_fields if field.type in arrow_types]
+    cursor_fields = [field.name for field in fields]
+    schema_fields = [pyarrow.field(field.name, arrow_types[field.type]) for field in fields]
+    metadata = None
+    if any(field.type == 'Geometry' for field in all_fields):
+        cursor_fields.append('SHAPE@WKB')
+        schema_fields.append(pyarrow.field('geometry', pyarrow.binary()))
+        # the coordinate system is not recorded (null), as it is not always a known EPSG code
+        metadata = {'geo': '{"version": "1.0.0", "primary_column": "geometry", "columns": {"geometry": {"encoding": "WKB", "geometry_types": [], "crs": null}}}'}
+    schema = pyarrow.schema(schema_fields, metadata=metadata)
+    row_count = 0
+    writer = pyarrow.parquet.ParquetWriter(parquet_path, schema, compression='snappy')
+    try:
+        with arcpy.da.SearchCursor(fc, cursor_fields) as cursor:
+            while True:
+                batch = list(itertools.islice(cursor, batch_size))
+                if not batch:
+                    break
+                columns = [list(column) for column in zip(*batch)]
+                if metadata:
+                    columns[-1] = [bytes(wkb) if wkb is not None else None for wkb in columns[-1]]
+                arrays = [pyarrow.array(column, type=schema_field.type) for column, schema_field in zip(columns, schema_fields)]
+                writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+                row_count += len(batch)
+            # end while
+        # end cursor
+    finally:
+        writer.close()
+    return row_count
+# end export_to_parquet()
+
+# Runs every stage for one layer: export to the file geodatabase, update the Latitude and Longitude
+# fields, then convert to Microsoft Excel
+# job is [source layer, output name, output file geodatabase, output directory, fields for update,
+# True to only update the rows whose values change (see update_coordinates_bulk()), Excel format ('XLS' or 'XLSX'),
+# True to also export to Parquet]
+# returns (output name, list of (stage, seconds), error message or None)
+def export_layer(job):
+    source, name, out_gdb, out_dir, fc_fields, bulk_update, excel_format, parquet_export = job
+    timings = []
     try:
-        if cursor:
-            del cursor
-    except:
-        pass
-    # write message to log file
+        # export feature class
+        # waiting for another worker to finish its export is timed separately
+        stage_start = time.time()
+        if export_lock is not None:
+            export_lock.acquire()
+            timings.append(('waiting', time.time() - stage_start))
+            stage_start = time.time()
+        try:
+            arcpy.FeatureClassToFeatureClass_conversion(source,out_gdb,name)
+        finally:
+            if export_lock is not None:
+                export_lock.release()
+        timings.append(('export', time.time() - stage_start))
+
+        # update Latitude Longitude fields
+        stage_start = time.time()
+        fc = os.path.join(out_gdb, name)
+        if bulk_update:
+            updated_count, row_count = update_coordinates_bulk(fc, fc_fields)
+        else:
+            updated_count = 0
+            with arcpy.da.UpdateCursor(fc, fc_fields) as cursor:
+                for row in cursor:
+                    # longitude
+                    row[1] = row[0][0]
+                    # latitude
+                    row[2] = row[0][1]
+                    # update record
+                    cursor.updateRow(row)
+                    updated_count += 1
+                # end for
+            # end cursor
+            row_count = updated_count
+        timings.append(('latitude/longitude ({} of {} rows updated)'.format(updated_count, row_count), time.time() - stage_start))
+
+        # convert to Excel
+        stage_start = time.time()
+        if excel_format == 'XLSX':
+            export_to_xlsx(fc,os.path.join(out_dir,'{}.xlsx'.format(name)))
+        else:
+            arcpy.TableToExcel_conversion(fc,os.path.join(out_dir,'{}.xls'.format(name)),"ALIAS")
+        timings.append(('excel', time.time() - stage_start))
+
+        # export to Parquet
+        if parquet_export and pyarrow is not None:
+            stage_start = time.time()
+            export_to_parquet(fc,os.path.join(out_dir,'{}.parquet'.format(name)))
+            timings.append(('parquet', time.time() - stage_start))
+        return name, timings, None
+    except Exception as e:
+        tbE = sys.exc_info()[2]
+        return name, timings, 'Failed at Line {}. Error: {}'.format(tbE.tb_lineno, e)
+# end export_layer()
+
+# layers are exported in worker processes, so the script only runs in the main process
+if __name__ == '__main__':
     try:
-        with open(log_file, 'w') as f:
-            f.write(str(logMsg))
-    except:
-        pass
\ No newline at end of file
+        # Time stamp variables
+        currentTime = datetime.datetime.now()
+        # Date formatted as month-day-year (1-1-2017)
+        dateToday = currentTime.strftime("%m-%d-%Y")
+        # date for file geodatabase name
+        dateGdb = currentTime.strftime("%m%d%Y")
+
+        # Create text file for logging results of script
+        # update this variable
+        log_file = r'[path]\[to]\[location]\Report File Name {}.txt'.format(dateToday)
+        # variable to store messages for log file. Messages written in finally statement at end of script
+        logMsg = ''
+
+        # sde database connection
+        # update this variable
+        sde = r'Database Connections\[SDE Database Name].sde'
+        # layers
+        # update this variable
+        layers = [[os.path.join(sde, r'Name of Layer'), 'Name of Layer'], [os.path.join(sde, r'Name of Layer'), 'Name of Layer'], [os.path.join(sde, r'Name of Layer'), 'Name of Layer']]
+
+        # 1. create new directory
+        # parent directory
+        # update this variable
+        parent_dir = r'[path]\[to]\[location]'
+        # output directory
+        out_dir = r'{}\{}'.format(parent_dir,dateGdb)
+        # create sub-directory with current date
+        os.mkdir(out_dir)
+        # add message
+        logMsg += '\nCreated directory "{}" in {}\n'.format(dateGdb,out_dir)
+
+        # 2. create file geodatabase
+        # parameters
+        # update this variable
+        out_gdb_name = r'Name_of_Geodatabase_{}'.format(dateGdb)
+        out_gdb = os.path.join(out_dir, '{}.gdb'.format(out_gdb_name))
+        # geoprocessing
+        arcpy.CreateFileGDB_management(out_dir,out_gdb_name,'10.0')
+        # add message
+        logMsg += '\nCreated file geodatabase "{}" in directory "{}"\n'.format(out_gdb_name, out_dir)
+
+        # 3. Export layers to file geodatabase, update Latitude Longitude fields in feature classes,
+        # and export feature classes to excel
+        # each layer goes through every step in a worker process, so different layers are in different steps at the same time
+        # number of worker processes
+        # update this variable; 1 runs the layers one at a time in this process
+        export_processes = 4
+        # only let one worker at a time export to the file geodatabase
+        # the latitude/longitude and Excel steps still run at the same time as an export
+        serialize_exports = True
+        # fields for update
+        # update this variable
+        # these are examples
+        fc_fields = ['SHAPE@XY', 'LON', 'LAT']
+        # compare the coordinates with the existing LON and LAT values as arrays, and only update the rows that change
+        # set to False to update every row
+        bulk_coordinate_update = True
+        # Microsoft Excel format
+        # 'XLSX' writes .xlsx files one row at a time, with a new worksheet every 1,048,575 rows
+        # 'XLS' uses the Table To Excel tool, which writes .xls files that are limited to 65,535 rows
+        excel_format = 'XLSX'
+        # also export each layer to a Parquet file, with the geometry as WKB
+        # requires the pyarrow package; the Parquet export is skipped if it is not installed
+        parquet_export = True
+        if parquet_export and pyarrow is None:
+            logMsg += '\nSkipped Parquet export because the pyarrow package is not installed\n'
+        # one job for each layer
+        jobs = [[fc[0], fc[1], out_gdb, out_dir, fc_fields, bulk_coordinate_update, excel_format, parquet_export] for fc in layers]
+        # Get the start time of the exports
+        export_start = time.time()
+        pool = None
+        try:
+            if export_processes > 1 and len(jobs) > 1:
+                pool = multiprocessing.Pool(min(export_processes, len(jobs)), init_worker, (multiprocessing.Lock() if serialize_exports else None,))
+                results = pool.imap_unordered(export_layer, jobs)
+            else:
+                results = itertools.imap(export_layer, jobs)
+            # add a message for each layer as it finishes
+            failed_layers = []
+            for name, timings, error in results:
+                # time of each step, e.g. export 12.5 seconds
+                stage_times = ', '.join('{} {} seconds'.format(stage, round(seconds, 2)) for stage, seconds in timings)
+                if error:
+                    failed_layers.append(name)
+                    logMsg += '\n{} layer {} ({})\n'.format(name, error, stage_times)
+                else:
+                    logMsg += '\nCopied {} layer to {}, updated Latitude and Longitude records, and exported to Microsof Excel format ({})\n'.format(name, out_gdb, stage_times)
+            # end for
+        finally:
+            if pool is not None:
+                pool.terminate()
+        # end try
+        # add message
+        logMsg += '\nCompleted {} of {} layers in {} seconds\n'.format(len(jobs) - len(failed_layers), len(jobs), round(time.time() - export_start, 2))
+        if failed_layers:
+            logMsg += '\nLayers that failed: {}\n'.format(', '.join(failed_layers))
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # add the error message to the log message
+        logMsg += "\nError: {}\n".format(str(e))
+    # handle exception error
+    except Exception as e:
+        # Store information about the error
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        logMsg += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # add the error message to the log message
+        logMsg += "\nError: {}\n".format(e.message)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(logMsg))
+        except:
+            pass
\ No newline at end of file
@@ -0,0 +1,247 @@
+#-------------------------------------------------------------------------------
+# Name:        GPX Tracks Helper Module
+#
+# Purpose:     Reads the tracks of a GPX file without loading the whole file into memory.
+#              The file is read with an incremental XML parser, elements are cleared once
+#              they are read, and the vertices of each track segment are kept in compact
+#              arrays of floats. Each track can be turned into well-known binary (WKB)
+#              for arcpy.FromWKB(). read_gpx_file() can be run in worker processes
+#              (e.g. multiprocessing.Pool) to read many GPX files at once.
+#
+#              Tracks can be simplified (Douglas-Peucker, with a tolerance in meters) with NumPy,
+#              and the length, duration and average speed of each track are calculated from
+#              the trackpoints and their timestamps.
+#
+#              This module does not use ArcPy, so it can be tested without ArcGIS.
+#
+# Author:      Cumberland County GIS
+#
+# Created:     10/18/2026
+# Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+# FITNESS FOR A PARTICULAR PURPOSE.
+# Furthermore, Cumberland County assumes no liability for any errors, omissions, or inaccuracies in the information provided regardless
+# of the cause of such, or for any decision made, action taken, or action not taken by the user in reliance upon any maps or data provided
+# herein. The user assumes the risk that the information may not be accurate.
+#-------------------------------------------------------------------------------
+
+import sys
+import struct
+import math
+import calendar
+from array import array
+import numpy
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+# Returns the name of an element tag without its namespace
+# e.g. '{http://www.topografix.com/GPX/1/1}trkpt' returns 'trkpt'
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+# end local_name()
+
+# mean radius of the earth in meters
+earth_radius = 6371008.8
+
+# Returns the seconds since 1970 of a GPX (ISO 8601) time, such as 2018-07-23T14:05:09Z or 2018-07-23T10:05:09.5-04:00
+# returns NaN if the time cannot be read
+def parse_gpx_time(text):
+    text = text.strip()
+    try:
+        seconds = calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]), int(text[11:13]), int(text[14:16]), int(text[17:19]), 0, 0, 0))
+        rest = text[19:]
+        # fractions of a second
+        if rest.startswith('.'):
+            digits = len(rest) - len(rest[1:].lstrip('0123456789'))
+            seconds += float(rest[:digits])
+            rest = rest[digits:]
+        # time zone offset
+        if rest[:1] in ('+', '-'):
+            offset = int(rest[1:3]) * 3600 + int(rest[-2:]) * 60
+            seconds -= offset if rest[0] == '+' else -offset
+        return float(seconds)
+    except ValueError:
+        return float('nan')
+# end parse_gpx_time()
+
+# Reads the tracks of a GPX file
+# yields (name, segments, segment_times) for each track, where segments is a list of arrays of x (longitude),
+# y (latitude) values for each track segment, and segment_times is a list of the (first, last) trackpoint
+# times (seconds since 1970) of each segment, or None for segments without times
+# segments with fewer than two points are left out
+def read_gpx_tracks(gpx_file):
+    root = None
+    # track segment element we are inside of, so its points can be removed once they are read
+    segment = None
+    # elements we are inside of
+    in_track = False
+    in_point = False
+    name = ''
+    segments = []
+    segment_times = []
+    vertices = None
+    first_time = last_time = None
+    point_time = None
+    for event, elem in ElementTree.iterparse(gpx_file, events=('start', 'end')):
+        tag = local_name(elem.tag)
+        if event == 'start':
+            if root is None:
+                root = elem
+            elif tag == 'trk':
+                in_track = True
+                name = ''
+                segments = []
+                segment_times = []
+            elif tag == 'trkseg':
+                segment = elem
+                vertices = array('d')
+                first_time = last_time = None
+            elif tag == 'trkpt':
+                in_point = True
+                point_time = None
+            continue
+        if tag == 'trkpt':
+            lat = elem.get('lat')
+            lon = elem.get('lon')
+            if lat is not None and lon is not None and vertices is not None:
+                vertices.append(float(lon))
+                vertices.append(float(lat))
+                if point_time:
+                    seconds = parse_gpx_time(point_time)
+                    if not math.isnan(seconds):
+                        if first_time is None:
+                            first_time = seconds
+                        last_time = seconds
+            in_point = False
+            # free the point that was just read, and remove it from its track segment,
+            # so memory does not grow with the number of points in a track
+            elem.clear()
+            if segment is not None:
+                del segment[:]
+        elif tag == 'time' and in_point:
+            point_time = elem.text
+        elif tag == 'trkseg':
+            if vertices is not None and len(vertices) >= 4:
+                segments.append(vertices)
+                segment_times.append((first_time, last_time) if first_time is not None else None)
+            vertices = None
+            segment = None
+            elem.clear()
+        elif tag == 'name' and in_track and not in_point:
+            name = (elem.text or '').strip()
+        elif tag == 'trk':
+            in_track = False
+            # free the elements of the track that was just read
+            elem.clear()
+            root.clear()
+            if segments:
+                yield name, segments, segment_times
+        elif tag in ('wpt', 'rte'):
+            # waypoints and routes are not used
+            elem.clear()
+            root.clear()
+    # end for
+# end read_gpx_tracks()
+
+# Returns the WKB of a multipart polyline (MultiLineString) from a list of arrays (array or numpy) of x, y values
+def track_wkb(segments):
+    # arrays are written in the byte order of this computer
+    byte_order = 1 if sys.byteorder == 'little' else 0
+    endian = '<' if byte_order else '>'
+    wkb = bytearray(struct.pack(endian + 'BII', byte_order, 5, len(segments)))
+    for vertices in segments:
+        wkb += struct.pack(endian + 'BII', byte_order, 2, len(vertices) // 2)
+        wkb += vertices.tostring()
+    # end for
+    return wkb
+# end track_wkb()
+
+# Returns the length in meters of a line of x (longitude), y (latitude) values, using the haversine formula
+def segment_length(vertices):
+    coordinates = numpy.radians(numpy.frombuffer(vertices, 'f8').reshape(-1, 2))
+    lon = coordinates[:, 0]
+    lat = coordinates[:, 1]
+    a = numpy.sin(numpy.diff(lat) / 2) ** 2 + numpy.cos(lat[:-1]) * numpy.cos(lat[1:]) * numpy.sin(numpy.diff(lon) / 2) ** 2
+    return float(2 * earth_radius * numpy.arcsin(numpy.sqrt(numpy.minimum(a, 1))).sum())
+# end segment_length()
+
+# Simplifies a line of x (longitude), y (latitude) values with the Douglas-Peucker algorithm
+# vertices closer than tolerance meters to the simplified line are removed
+# coordinates are projected to meters around the middle of the line (equirectangular), which is accurate
+# enough for the short distances of a tolerance
+# returns an array of the x, y values of the vertices that are kept
+def simplify_segment(vertices, tolerance):
+    coordinates = numpy.frombuffer(vertices, 'f8').reshape(-1, 2)
+    if tolerance <= 0 or len(coordinates) < 3:
+        return coordinates.ravel()
+    meters_per_degree = math.radians(earth_radius)
+    x = coordinates[:, 0] * meters_per_degree * math.cos(math.radians(coordinates[:, 1].mean()))
+    y = coordinates[:, 1] * meters_per_degree
+    keep = numpy.zeros(len(coordinates), bool)
+    keep[0] = keep[-1] = True
+    # ranges of vertices still to check; every range is checked at once, and the ranges that
+    # have a vertex farther than tolerance are split at that vertex for the next pass
+    starts = numpy.array([0])
+    ends = numpy.array([len(coordinates) - 1])
+    while len(starts):
+        counts = ends - starts - 1
+        starts, ends, counts = starts[counts > 0], ends[counts > 0], counts[counts > 0]
+        if not len(starts):
+            break
+        # index of every vertex inside a range, and the range it is in
+        range_ids = numpy.repeat(numpy.arange(len(starts)), counts)
+        offsets = numpy.cumsum(counts) - counts
+        index = numpy.arange(counts.sum()) - offsets[range_ids] + starts[range_ids] + 1
+        # distance (squared) from each vertex to the segment from the start to the end of its range
+        sx = x[starts][range_ids]
+        sy = y[starts][range_ids]
+        dx = x[ends][range_ids] - sx
+        dy = y[ends][range_ids] - sy
+        px = x[index] - sx
+        py = y[index] - sy
+        length = dx * dx + dy * dy
+        t = numpy.clip((px * dx + py * dy) / numpy.where(length > 0, length, 1), 0, 1)
+        distance = (px - t * dx) ** 2 + (py - t * dy) ** 2
+        # farthest vertex of each range
+        max_distance = numpy.maximum.reduceat(distance, offsets)
+        farthest = numpy.flatnonzero(distance == max_distance[range_ids])
+        farthest = farthest[numpy.concatenate([[True], range_ids[farthest][1:] != range_ids[farthest][:-1]])]
+        split = max_distance > tolerance * tolerance
+        middle = index[farthest][split]
+        keep[middle] = True
+        starts, ends = numpy.concatenate([starts[split], middle]), numpy.concatenate([middle, ends[split]])
+    # end while
+    return coordinates[keep].ravel()
+# end simplify_segment()
+
+# Returns the length (meters), duration (seconds) and average speed (kilometers per hour) of a track
+# duration is the time spent in the track segments, so the time between segments (e.g. pauses) is not counted
+# duration and speed are None when the track has no times
+def track_metrics(segments, segment_times):
+    lengths = [segment_length(vertices) for vertices in segments]
+    timed = [(length, times[1] - times[0]) for length, times in zip(lengths, segment_times) if times]
+    duration = sum(seconds for length, seconds in timed) if timed else None
+    speed = sum(length for length, seconds in timed) / duration * 3.6 if duration else None
+    return sum(lengths), duration, speed
+# end track_metrics()
+
+# Reads the tracks of a GPX file as WKB
+# the length, duration and average speed of each track (see track_metrics()) are calculated before the
+# track is simplified with tolerance meters (0 to keep every vertex)
+# returns (gpx file, list of (name, WKB, length, duration, speed) for each track, error message or None)
+# errors are returned instead of raised so one bad file does not stop a batch of files
+def read_gpx_file(gpx_file, tolerance=0):
+    try:
+        tracks = []
+        for name, segments, segment_times in read_gpx_tracks(gpx_file):
+            length, duration, speed = track_metrics(segments, segment_times)
+            if tolerance > 0:
+                segments = [simplify_segment(vertices, tolerance) for vertices in segments]
+            tracks.append((name, track_wkb(segments), length, duration, speed))
+        # end for
+        return gpx_file, tracks, None
+    except Exception as e:
+        return gpx_file, [], '{}: {}'.format(type(e).__name__, e)
+# end read_gpx_file()
\ No newline at end of file
@@ -0,0 +1,302 @@
+#-------------------------------------------------------------------------------
+# Name:        Polygon Centroids Helper Module
+#
+# Purpose:     Calculates the area-weighted (true) centroids of polygons with NumPy.
+#              Polygons are read as well-known binary (e.g. from the 'SHAPE@WKB' token
+#              of an arcpy.da.SearchCursor), the coordinates of every ring are packed into
+#              one array, and the centroids of a batch of polygons are calculated at once
+#              with the shoelace formula.  Multipart polygons and holes are supported.
+#
+#              Optionally, points that fall outside their polygon (e.g. for concave or multipart
+#              polygons) are moved to an interior point (the pole of inaccessibility) of the polygon.
+#
+#              This module does not use ArcPy, so it can be tested without ArcGIS.
+#
+# Author:      Cumberland County GIS
+#
+# Created:     10/18/2026
+# Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+# FITNESS FOR A PARTICULAR PURPOSE.
+# Furthermore, Cumberland County assumes no liability for any errors, omissions, or inaccuracies in the information provided regardless
+# of the cause of such, or for any decision made, action taken, or action not taken by the user in reliance upon any maps or data provided
+# herein. The user assumes the risk that the information may not be accurate.
+#-------------------------------------------------------------------------------
+
+import struct
+import heapq
+import math
+import numpy
+
+# Returns the base geometry type and number of dimensions of a WKB geometry type code
+# handles ISO (1000 = Z, 2000 = M, 3000 = ZM) and extended (flag bits) codes
+def wkb_type(type_code):
+    has_z = bool(type_code & 0x80000000)
+    has_m = bool(type_code & 0x40000000)
+    type_code &= 0xffff
+    has_z = has_z or type_code // 1000 in (1, 3)
+    has_m = has_m or type_code // 1000 in (2, 3)
+    return type_code % 1000, 2 + has_z + has_m
+# end wkb_type()
+
+# Reads a WKB polygon starting at offset
+# returns a list of (coordinates, is hole) for each ring, and the offset after the polygon
+def read_wkb_polygon(wkb, offset):
+    byte_order = '<' if wkb[offset] == 1 else '>'
+    geometry_type, dimensions = wkb_type(struct.unpack_from(byte_order + 'I', wkb, offset + 1)[0])
+    ring_count = struct.unpack_from(byte_order + 'I', wkb, offset + 5)[0]
+    offset += 9
+    rings = []
+    for ring_index in range(ring_count):
+        point_count = struct.unpack_from(byte_order + 'I', wkb, offset)[0]
+        offset += 4
+        coordinates = numpy.frombuffer(wkb, byte_order + 'f8', point_count * dimensions, offset).reshape(point_count, dimensions)
+        offset += 8 * point_count * dimensions
+        # the first ring of a polygon is the exterior ring, the others are holes
+        rings.append((coordinates[:, :2], ring_index > 0))
+    return rings, offset
+# end read_wkb_polygon()
+
+# Returns a list of (coordinates, is hole) for each ring of a WKB polygon or multipolygon
+def wkb_rings(wkb):
+    wkb = bytearray(wkb)
+    byte_order = '<' if wkb[0] == 1 else '>'
+    geometry_type, dimensions = wkb_type(struct.unpack_from(byte_order + 'I', wkb, 1)[0])
+    if geometry_type == 3:
+        return read_wkb_polygon(wkb, 0)[0]
+    if geometry_type == 6:
+        rings = []
+        offset = 9
+        for part in range(struct.unpack_from(byte_order + 'I', wkb, 5)[0]):
+            part_rings, offset = read_wkb_polygon(wkb, offset)
+            rings += part_rings
+        return rings
+    raise ValueError('WKB geometry type {} is not a polygon'.format(geometry_type))
+# end wkb_rings()
+
+# Packs the rings of a list of polygons (as lists of (coordinates, is hole)) into arrays
+# returns a dictionary of:
+#   coordinates - array of the x, y coordinates of every ring
+#   ring_starts - index of the first coordinate of each ring
+#   ring_polygons - index of the polygon each ring belongs to
+#   ring_holes - True for rings that are holes
+#   polygon_count - number of polygons
+def pack_polygons(polygons):
+    ring_coordinates = []
+    ring_polygons = []
+    ring_holes = []
+    for polygon_index, rings in enumerate(polygons):
+        for coordinates, is_hole in rings:
+            # rings need at least three distinct vertices to have an area
+            if len(coordinates) >= 4:
+                ring_coordinates.append(coordinates)
+                ring_polygons.append(polygon_index)
+                ring_holes.append(is_hole)
+    ring_lengths = numpy.array([len(coordinates) for coordinates in ring_coordinates], 'i8')
+    return {
+        'coordinates': numpy.concatenate(ring_coordinates) if ring_coordinates else numpy.zeros((0, 2)),
+        'ring_starts': numpy.concatenate([[0], numpy.cumsum(ring_lengths)[:-1]]).astype('i8') if len(ring_lengths) else ring_lengths,
+        'ring_polygons': numpy.array(ring_polygons, 'i8'),
+        'ring_holes': numpy.array(ring_holes, bool),
+        'polygon_count': len(polygons)
+    }
+# end pack_polygons()
+
+# Returns the ring of each coordinate of packed polygons, and a mask of the segments between
+# consecutive coordinates that are part of a ring (the segment from the last vertex of a ring
+# to the first vertex of the next ring is not)
+def ring_segments(packed):
+    ring_starts = packed['ring_starts']
+    ring_lengths = numpy.diff(numpy.concatenate([ring_starts, [len(packed['coordinates'])]]))
+    vertex_rings = numpy.repeat(numpy.arange(len(ring_starts)), ring_lengths)
+    in_ring = numpy.ones(max(len(vertex_rings) - 1, 0), bool)
+    in_ring[ring_starts[1:] - 1] = False
+    return vertex_rings, in_ring
+# end ring_segments()
+
+# Calculates the area-weighted centroids of packed polygons (see pack_polygons()) in one step
+# Rings must be closed (the last vertex is the same as the first), as they are in WKB.
+# Exterior rings add to the area of a polygon and holes subtract from it, whichever way they are wound.
+# returns arrays of the centroid x and y values and the area of each polygon (NaN for empty polygons)
+def packed_centroids(packed):
+    coordinates = packed['coordinates']
+    ring_starts = packed['ring_starts']
+    ring_polygons = packed['ring_polygons']
+    polygon_count = packed['polygon_count']
+    ring_count = len(ring_starts)
+    if not ring_count:
+        empty = numpy.nan * numpy.ones(polygon_count)
+        return empty, empty.copy(), empty.copy()
+    vertex_rings, in_ring = ring_segments(packed)
+    vertex_polygons = ring_polygons[vertex_rings]
+    # move each polygon so its first vertex is at 0, 0 to keep precision with large coordinates
+    has_rings = numpy.bincount(ring_polygons, minlength=polygon_count) > 0
+    origins = numpy.zeros((polygon_count, 2))
+    first_rings = numpy.searchsorted(ring_polygons, numpy.arange(polygon_count))
+    origins[has_rings] = coordinates[ring_starts[first_rings[has_rings]]]
+    x = coordinates[:, 0] - origins[vertex_polygons, 0]
+    y = coordinates[:, 1] - origins[vertex_polygons, 1]
+    # shoelace terms for each segment
+    cross = x[:-1] * y[1:] - x[1:] * y[:-1]
+    segment_x = (x[:-1] + x[1:]) * cross
+    segment_y = (y[:-1] + y[1:]) * cross
+    segment_rings = vertex_rings[:-1][in_ring]
+    ring_area = numpy.bincount(segment_rings, cross[in_ring], ring_count) / 2.0
+    ring_moment_x = numpy.bincount(segment_rings, segment_x[in_ring], ring_count) / 6.0
+    ring_moment_y = numpy.bincount(segment_rings, segment_y[in_ring], ring_count) / 6.0
+    # exterior rings count as positive areas and holes as negative areas
+    ring_sign = numpy.sign(ring_area) * numpy.where(packed['ring_holes'], -1, 1)
+    area = numpy.bincount(ring_polygons, ring_area * ring_sign, polygon_count)
+    moment_x = numpy.bincount(ring_polygons, ring_moment_x * ring_sign, polygon_count)
+    moment_y = numpy.bincount(ring_polygons, ring_moment_y * ring_sign, polygon_count)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        centroid_x = moment_x / area + origins[:, 0]
+        centroid_y = moment_y / area + origins[:, 1]
+        # polygons without an area use the average of their vertices
+        no_area = has_rings & (area == 0)
+        if no_area.any():
+            vertex_count = numpy.bincount(vertex_polygons, minlength=polygon_count)
+            centroid_x[no_area] = (numpy.bincount(vertex_polygons, coordinates[:, 0], polygon_count) / vertex_count)[no_area]
+            centroid_y[no_area] = (numpy.bincount(vertex_polygons, coordinates[:, 1], polygon_count) / vertex_count)[no_area]
+    area[~has_rings] = numpy.nan
+    centroid_x[~has_rings] = numpy.nan
+    centroid_y[~has_rings] = numpy.nan
+    return centroid_x, centroid_y, area
+# end packed_centroids()
+
+# Builds an index of the edges of packed polygons (see pack_polygons())
+# returns a dictionary of:
+#   edges - arrays of the start x, start y, end x and end y of every edge, grouped by polygon
+#   edge_polygons - index of the polygon each edge belongs to
+#   edge_starts - index of the first edge of each polygon; the edges of polygon i are edge_starts[i]:edge_starts[i + 1]
+def polygon_edges(packed):
+    coordinates = packed['coordinates']
+    vertex_rings, in_ring = ring_segments(packed)
+    x = coordinates[:, 0]
+    y = coordinates[:, 1]
+    edge_polygons = packed['ring_polygons'][vertex_rings[:-1][in_ring]] if len(in_ring) else numpy.zeros(0, 'i8')
+    return {
+        'edges': (x[:-1][in_ring], y[:-1][in_ring], x[1:][in_ring], y[1:][in_ring]),
+        'edge_polygons': edge_polygons,
+        'edge_starts': numpy.searchsorted(edge_polygons, numpy.arange(packed['polygon_count'] + 1))
+    }
+# end polygon_edges()
+
+# Returns True for the edges crossed by a ray from each point in the +x direction (even-odd rule)
+def ray_crossings(x0, y0, x1, y1, x, y):
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return ((y0 > y) != (y1 > y)) & (x < (x1 - x0) * (y - y0) / (y1 - y0) + x0)
+# end ray_crossings()
+
+# Tests whether the point of each polygon is inside that polygon, for all polygons at once
+# px, py are arrays with one point for each polygon in edge_index (see polygon_edges())
+def points_in_polygons(edge_index, px, py):
+    x0, y0, x1, y1 = edge_index['edges']
+    edge_polygons = edge_index['edge_polygons']
+    crossed = ray_crossings(x0, y0, x1, y1, px[edge_polygons], py[edge_polygons])
+    return numpy.bincount(edge_polygons[crossed], minlength=len(px)) % 2 == 1
+# end points_in_polygons()
+
+# Returns the distance from a point to the nearest edge of a polygon, negative if the point is outside the polygon
+def signed_distance(x, y, edges):
+    x0, y0, x1, y1 = edges
+    dx = x1 - x0
+    dy = y1 - y0
+    length = dx * dx + dy * dy
+    # position of the nearest point along each edge
+    t = numpy.clip(((x - x0) * dx + (y - y0) * dy) / numpy.where(length > 0, length, 1), 0, 1)
+    distance = math.sqrt(numpy.min((x0 + t * dx - x) ** 2 + (y0 + t * dy - y) ** 2))
+    inside = numpy.count_nonzero(ray_crossings(x0, y0, x1, y1, x, y)) % 2 == 1
+    return distance if inside else -distance
+# end signed_distance()
+
+# Finds the pole of inaccessibility of a polygon, the interior point farthest from its edges,
+# to within precision (in map units), by splitting the polygon extent into cells and only
+# splitting the cells that could contain a better point
+# when precision is None, it is 1% of the width or height (the smaller one) of the polygon
+# cells are split until a point inside the polygon is found, however large precision is
+# start_points are candidate points, such as the centroid, that are kept if nothing better is found
+# at most max_cells cells are checked, so polygons without area (which have no inside) stop
+def pole_of_inaccessibility(edges, precision=None, start_points=(), max_cells=100000):
+    x0, y0, x1, y1 = edges
+    min_x = min(x0.min(), x1.min())
+    min_y = min(y0.min(), y1.min())
+    max_x = max(x0.max(), x1.max())
+    max_y = max(y0.max(), y1.max())
+    cell_size = min(max_x - min_x, max_y - min_y)
+    best = (min_x + (max_x - min_x) / 2.0, min_y + (max_y - min_y) / 2.0)
+    best_distance = signed_distance(best[0], best[1], edges)
+    for x, y in start_points:
+        distance = signed_distance(x, y, edges)
+        if distance > best_distance:
+            best, best_distance = (x, y), distance
+    if cell_size == 0:
+        return best
+    if precision is None:
+        precision = cell_size / 100.0
+    # queue of cells ordered by the largest distance a point in the cell could have
+    cells = []
+    def add_cell(x, y, half):
+        distance = signed_distance(x, y, edges)
+        heapq.heappush(cells, (-(distance + half * math.sqrt(2)), x, y, half, distance))
+    # end add_cell()
+    half = cell_size / 2.0
+    for x in numpy.arange(min_x, max_x, cell_size):
+        for y in numpy.arange(min_y, max_y, cell_size):
+            add_cell(x + half, y + half, half)
+    checked_cells = 0
+    while cells:
+        max_distance, x, y, half, distance = heapq.heappop(cells)
+        checked_cells += 1
+        if distance > best_distance:
+            best, best_distance = (x, y), distance
+        # no point in the cell can be inside the polygon
+        if -max_distance <= 0:
+            continue
+        if checked_cells >= max_cells:
+            break
+        # once the best point is inside the polygon, stop splitting cells that cannot hold a point
+        # more than precision better than the best point
+        if best_distance > 0 and -max_distance - best_distance <= precision:
+            continue
+        half /= 2.0
+        add_cell(x - half, y - half, half)
+        add_cell(x + half, y - half, half)
+        add_cell(x - half, y + half, half)
+        add_cell(x + half, y + half, half)
+    # end while
+    return best
+# end pole_of_inaccessibility()
+
+# Moves the points (e.g. centroids) of packed polygons that are not inside their polygon to an interior point
+# all points are checked at once with a point in polygon test, and the pole of inaccessibility
+# is only calculated for the polygons that fail it
+# returns arrays of the x and y values and the number of points that were moved
+def interior_points(packed, px, py, precision=None):
+    edge_index = polygon_edges(packed)
+    edge_starts = edge_index['edge_starts']
+    has_edges = edge_starts[1:] > edge_starts[:-1]
+    outside = has_edges & ~points_in_polygons(edge_index, px, py)
+    px = px.copy()
+    py = py.copy()
+    for polygon_index in numpy.nonzero(outside)[0]:
+        start, end = edge_starts[polygon_index], edge_starts[polygon_index + 1]
+        edges = tuple(values[start:end] for values in edge_index['edges'])
+        px[polygon_index], py[polygon_index] = pole_of_inaccessibility(edges, precision, [(px[polygon_index], py[polygon_index])])
+    # end for
+    return px, py, int(outside.sum())
+# end interior_points()
+
+# Returns the centroid (x, y) of each polygon in a list of WKB polygons, or None for empty or null shapes
+# when interior is True, centroids outside their polygon are moved to an interior point (see interior_points())
+# when counts is a dictionary, the number of centroids that were moved is added to counts['moved']
+def wkb_centroids(wkb_list, interior=False, precision=None, counts=None):
+    polygons = [wkb_rings(wkb) if wkb else [] for wkb in wkb_list]
+    packed = pack_polygons(polygons)
+    centroid_x, centroid_y, area = packed_centroids(packed)
+    if interior:
+        centroid_x, centroid_y, moved = interior_points(packed, centroid_x, centroid_y, precision)
+        if counts is not None:
+            counts['moved'] = counts.get('moved', 0) + moved
+    return [(x, y) if numpy.isfinite(x) else None for x, y in zip(centroid_x.tolist(), centroid_y.tolist())]
+# end wkb_centroids()
@@ -0,0 +1,86 @@
+#-------------------------------------------------------------------------------
+# Name:        Schema Fingerprint Helper Module
+#
+# Purpose:     Returns a fingerprint (SHA-1 hash) of a schema XML file, such as the
+#              file written by the Export Replica Schema tool. The file is read with an
+#              incremental XML parser, and elements are cleared once they are read, so
+#              large schemas are not loaded into memory.
+#
+#              The hash of each element is made from its tag, attributes, text and the
+#              sorted hashes of its child elements, so the order of elements does not
+#              change the fingerprint. Elements with date or time tags (e.g. creation
+#              dates) are left out, so two exports of the same schema have the same
+#              fingerprint.
+#
+#              This module does not use ArcPy, so it can be tested without ArcGIS.
+#
+# Author:      Cumberland County GIS
+#
+# Created:     10/18/2026
+# Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+# FITNESS FOR A PARTICULAR PURPOSE.
+# Furthermore, Cumberland County assumes no liability for any errors, omissions, or inaccuracies in the information provided regardless
+# of the cause of such, or for any decision made, action taken, or action not taken by the user in reliance upon any maps or data provided
+# herein. The user assumes the risk that the information may not be accurate.
+#-------------------------------------------------------------------------------
+
+import re
+import hashlib
+try:
+    import xml.etree.cElementTree as ElementTree
+except ImportError:
+    import xml.etree.ElementTree as ElementTree
+
+# tags (without their namespace) of elements that are left out of the fingerprint
+# tags that are, or end in, the CamelCase word Date, Time, Timestamp or TimeStamp
+# e.g. CreationDate, LastSyncDate, ModifiedTime, TimeStamp, but not Update, CanUpdate or Runtime
+ignored_tags = re.compile(r'(?:^|(?<=[a-z0-9_]))(?:Date|Time|Timestamp|TimeStamp)$')
+
+# Returns the name of an element tag or attribute without its namespace
+# e.g. '{http://www.esri.com/schemas/ArcGIS/10.1}CreationDate' returns 'CreationDate'
+def local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+# end local_name()
+
+# Returns the hash of an element from its tag, attributes, text and the hashes of its child elements
+def element_hash(elem, child_hashes):
+    digest = hashlib.sha1()
+    digest.update(elem.tag.encode('utf-8'))
+    # attributes and child elements are sorted, so their order does not matter
+    for name, value in sorted(elem.attrib.items()):
+        digest.update(u'\x00{}={}'.format(name, value).encode('utf-8'))
+    # surrounding whitespace is formatting, not schema
+    digest.update(u'\x01{}'.format((elem.text or u'').strip()).encode('utf-8'))
+    for child_hash in sorted(child_hashes):
+        digest.update(child_hash)
+    return digest.digest()
+# end element_hash()
+
+# Returns the fingerprint (hexadecimal SHA-1 hash) of an XML file
+# elements with tags that match ignore_tags (a compiled regular expression of tags without their namespace),
+# and everything inside them, are left out
+def schema_fingerprint(xml_file, ignore_tags=ignored_tags):
+    # hashes of the child elements of each element we are inside of
+    child_hashes = [[]]
+    # depth of the ignored element we are inside of, or None
+    ignored_depth = None
+    root_hash = None
+    for event, elem in ElementTree.iterparse(xml_file, events=('start', 'end')):
+        if event == 'start':
+            if ignored_depth is None and ignore_tags is not None and ignore_tags.search(local_name(elem.tag)):
+                ignored_depth = len(child_hashes)
+            child_hashes.append([])
+            continue
+        hashes = child_hashes.pop()
+        if ignored_depth is not None:
+            if len(child_hashes) == ignored_depth:
+                ignored_depth = None
+        else:
+            root_hash = element_hash(elem, hashes)
+            child_hashes[-1].append(root_hash)
+        # free the element that was just read; its hash is kept instead
+        elem.clear()
+    # end for
+    return root_hash.encode('hex') if root_hash is not None else hashlib.sha1().hexdigest()
+# end schema_fingerprint()
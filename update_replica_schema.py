@@ -32,113 +32,248 @@ import os
 import sys
 import time
 import datetime
+import itertools
+import multiprocessing
+import json
 import print_errors
+# note the imported "schema_fingerprint" helper module that is located within this "ArcPy" repo
+import schema_fingerprint
 
-try:
-    # Get the start time of the geoprocessing tool(s)
-    start_time = time.clock()
-
-    # Time stamp variables
-    date_today = datetime.date.today()
-    # Date formatted as month-day-year (1-1-2017)
-    # used in creating log file
-    formatted_date_today = date_today.strftime("%m-%d-%Y")
-    # date formatted as MonthDayYear (01012017)
-    # used in creating directory to store schema xml files in
-    folder_formatted_date_today = date_today.strftime("%m%d%Y")
-
-    # variable to store messages for log file. Messages written in finally statement at end of script
-    log_message = ''
-    # Create text file for logging results of script
-    log_file = r'\Path\To\Directory\Update Schema Report {}.txt'.format(formatted_date_today)
-
-    # root directory for schema change files
-    # each time this script is run, a sub-directory with the current date will be created
-    # replication compare xml files will be created in sub-directory
-    base_dir = r'\Path\To\Directory'
-    # directory to store schema change files
-    out_dir = os.path.join(base_dir, folder_formatted_date_today)
-    # create directory
-    os.mkdir(out_dir)
-    # add message
-    log_message += 'Created output directory for schema changes at {}\n'.format(out_dir)
-
-    # parent enterprise geodatabase in replication
-    sde_ccgis = r"\Path\To\SDE Connection File\geodatabase.sde"
-
-    # list of dictionaries containing data for each replica you want to update schema for
-    # name = human friendly name for replica; used in log file messages
-    # geodatabase = path to the child geodatabase participating in replica
-    # child_output = output xml file generated when comparing parent geodatabase to child geodatabase
-    # replica_changes = output xml file that is imported into child geodatabase to bring in schema changes from parent geodatabase
-    replication_data = [
-        {
-            "name": "Planning Department",
-            "geodatabase": r"\Path\To\Geodatabase\Geodata.gdb",
-            "replica": "SDE.Planning_Replica",
-            "child_output": r"{}\planning_schema_export.xml".format(out_dir),
-            "replica_changes": r"{}\planning_schema_changes.xml".format(out_dir)
-        },
-        {
-            "name": "Public Works",
-            "geodatabase": r"\Path\To\Geodatabase\Geodata.gdb",
-            "replica": "SDE.PublicWorks_Replica",
-            "child_output": r"{}\public_works_schema_export.xml".format(out_dir),
-            "replica_changes": r"{}\public_works_schema_changes.xml".format(out_dir)
-        }
-    ]
-
-    # loop through list of replications and update schema
-    for replica in replication_data:
+# Exports the schema of a replica from the parent geodatabase, and gets the fingerprint of the exported schema
+# each replica is exported once for the run, however many child geodatabases use it
+# job is [parent geodatabase, replica name, output xml file]
+# returns (replica name, output xml file, schema fingerprint, error message or None)
+def export_schema(job):
+    parent_gdb, replica_name, schema_file = job
+    try:
+        arcpy.ExportReplicaSchema_management(parent_gdb, schema_file, replica_name)
+        return replica_name, schema_file, schema_fingerprint.schema_fingerprint(schema_file), None
+    except Exception as e:
+        return replica_name, schema_file, None, print_errors.print_exception(e)
+# end export_schema()
+
+# Compares the parent schema with one child geodatabase, and imports the changes into the child
+# replicas that share a child geodatabase are updated one after the other, so each child gets one job
+# job is a list of the replication_data dictionaries of one child geodatabase, with the "parent_schema" file,
+# whether the export was "reused_export" from another entry, and the "export_error" message (None if it was exported)
+# returns a list of (log message, True if the changes were imported), one for each replica
+def update_child(job):
+    messages = []
+    for replica in job:
+        # add message
+        message = '\nRunning schema update process for {}\n'.format(replica["name"])
+        if replica["export_error"]:
+            # the child cannot be compared without the parent schema
+            message += '\nError exporting schema for {} replication\n'.format(replica["name"])
+            message += replica["export_error"]
+            messages.append((message, False))
+            continue
         try:
             # add message
-            log_message += '\nRunning schema update process for {}\n'.format(replica["name"])
-            # export schema from parent geodatabase
-            arcpy.ExportReplicaSchema_management(sde_ccgis, replica["child_output"], replica["replica"])
-            # add message
-            log_message += '\n\tExported schema for CCGIS geodatabase\n'
+            message += '\n\tExported schema for CCGIS geodatabase{}\n'.format(' (reused export of {})'.format(replica["parent_schema"]) if replica["reused_export"] else '')
             # create compare file between parent and child
-            arcpy.CompareReplicaSchema_management(replica["geodatabase"], replica["child_output"], replica["replica_changes"])
+            arcpy.CompareReplicaSchema_management(replica["geodatabase"], replica["parent_schema"], replica["replica_changes"])
             # add message
-            log_message += '\n\tCompared changes to child geodatabase\n'
+            message += '\n\tCompared changes to child geodatabase\n'
             # import schema compare file into child geodatabase
             arcpy.ImportReplicaSchema_management(replica["geodatabase"], replica["replica_changes"])
             # add message
-            log_message += '\n\tImported changes into child geodatabase\n'
+            message += '\n\tImported changes into child geodatabase\n'
+            messages.append((message, True))
         except EnvironmentError as e:
-            log_message += '\nError running {} replication\n'.format(replica["name"])
-            log_message += print_errors.print_exception(e)
+            message += '\nError running {} replication\n'.format(replica["name"])
+            message += print_errors.print_exception(e)
+            messages.append((message, False))
         except Exception as e:
-            log_message += '\nError running {} replication\n'.format(replica["name"])
-            log_message += print_errors.print_exception(e)
-    # end for loop
-
-    # Get the end time of the geoprocessing tool(s)
-    finish_time = time.clock()
-    # Get the total time to run the geoprocessing tool(s)
-    elapsed_time = finish_time - start_time
-    # total time in minutes
-    elapsed_time_minutes =  round((elapsed_time / 60), 2)
-
-    # Write message to a log file
-    log_message += "\nSuccessfully updated replication schemas for departments in {}-minutes on {}\n".format(elapsed_time_minutes,formatted_date_today)
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except EnvironmentError as e:
-    tbE = sys.exc_info()[2]
-    # Write the line number the error occured to the log file
-    log_message += "\nFailed at Line {}\n".format(tbE.tb_lineno)
-    # Write the error message to the log file
-    log_message += "Error: {}".format(str(e))
-except Exception as e:
-    # If an error occurred, write line number and error message to log
-    tb = sys.exc_info()[2]
-    log_message += "\nFailed at Line {}\n".format(tb.tb_lineno)
-    log_message += "Error: {}".format(e)
-finally:
-    # write message to log file
+            message += '\nError running {} replication\n'.format(replica["name"])
+            message += print_errors.print_exception(e)
+            messages.append((message, False))
+    # end for
+    return messages
+# end update_child()
+
+# schemas are compared and imported in worker processes, so the script only runs in the main process
+if __name__ == '__main__':
     try:
-        with open(log_file, 'w') as f:
-            f.write(str(log_message))
-    except:
-        pass
\ No newline at end of file
+        # Get the start time of the geoprocessing tool(s)
+        start_time = time.time()
+
+        # Time stamp variables
+        date_today = datetime.date.today()
+        # Date formatted as month-day-year (1-1-2017)
+        # used in creating log file
+        formatted_date_today = date_today.strftime("%m-%d-%Y")
+        # date formatted as MonthDayYear (01012017)
+        # used in creating directory to store schema xml files in
+        folder_formatted_date_today = date_today.strftime("%m%d%Y")
+
+        # variable to store messages for log file. Messages written in finally statement at end of script
+        log_message = ''
+        # Create text file for logging results of script
+        log_file = r'\Path\To\Directory\Update Schema Report {}.txt'.format(formatted_date_today)
+
+        # root directory for schema change files
+        # each time this script is run, a sub-directory with the current date will be created
+        # replication compare xml files will be created in sub-directory
+        base_dir = r'\Path\To\Directory'
+        # directory to store schema change files
+        out_dir = os.path.join(base_dir, folder_formatted_date_today)
+        # create directory
+        os.mkdir(out_dir)
+        # add message
+        log_message += 'Created output directory for schema changes at {}\n'.format(out_dir)
+
+        # parent enterprise geodatabase in replication
+        sde_ccgis = r"\Path\To\SDE Connection File\geodatabase.sde"
+
+        # number of schema exports, or child geodatabases being compared and imported, at the same time
+        # replicas that share a child geodatabase are always updated one after the other
+        max_concurrent = 4
+
+        # json file of the schema fingerprint of each replica and child geodatabase from the last successful import
+        # a replica whose exported schema has the same fingerprint is not compared or imported, so the child is not locked
+        fingerprint_file = os.path.join(base_dir, 'schema_fingerprints.json')
+        # when True, every replica is compared and imported, even if its schema has not changed
+        force_update = False
+
+        # list of dictionaries containing data for each replica you want to update schema for
+        # name = human friendly name for replica; used in log file messages
+        # geodatabase = path to the child geodatabase participating in replica
+        # child_output = output xml file generated when exporting the replica schema from the parent geodatabase
+        #                (entries with the same replica use the first entry's export)
+        # replica_changes = output xml file that is imported into child geodatabase to bring in schema changes from parent geodatabase
+        replication_data = [
+            {
+                "name": "Planning Department",
+                "geodatabase": r"\Path\To\Geodatabase\Geodata.gdb",
+                "replica": "SDE.Planning_Replica",
+                "child_output": r"{}\planning_schema_export.xml".format(out_dir),
+                "replica_changes": r"{}\planning_schema_changes.xml".format(out_dir)
+            },
+            {
+                "name": "Public Works",
+                "geodatabase": r"\Path\To\Geodatabase\Geodata.gdb",
+                "replica": "SDE.PublicWorks_Replica",
+                "child_output": r"{}\public_works_schema_export.xml".format(out_dir),
+                "replica_changes": r"{}\public_works_schema_changes.xml".format(out_dir)
+            }
+        ]
+
+        # export the parent schema of each replica once for the run
+        # cache of replica name to exported schema file
+        parent_schemas = {}
+        export_jobs = []
+        for replica in replication_data:
+            replica_key = replica["replica"].lower()
+            replica["reused_export"] = replica_key in parent_schemas
+            if not replica["reused_export"]:
+                parent_schemas[replica_key] = replica["child_output"]
+                export_jobs.append([sde_ccgis, replica["replica"], replica["child_output"]])
+            replica["parent_schema"] = parent_schemas[replica_key]
+        # end for
+
+        # group the replicas by child geodatabase, keeping the order of the list
+        children = []
+        child_replicas = {}
+        for replica in replication_data:
+            child_key = os.path.normcase(os.path.abspath(replica["geodatabase"]))
+            if child_key not in child_replicas:
+                children.append(child_key)
+                child_replicas[child_key] = []
+            child_replicas[child_key].append(replica)
+        # end for
+
+        pool = None
+        try:
+            if max_concurrent > 1 and max(len(export_jobs), len(children)) > 1:
+                pool = multiprocessing.Pool(min(max_concurrent, max(len(export_jobs), len(children))))
+                map_function = pool.imap
+            else:
+                map_function = itertools.imap
+
+            # export schema from parent geodatabase
+            export_errors = {}
+            fingerprints = {}
+            for replica_name, schema_file, fingerprint, error in map_function(export_schema, export_jobs):
+                if error:
+                    export_errors[replica_name.lower()] = error
+                else:
+                    fingerprints[replica_name.lower()] = fingerprint
+            # end for
+
+            # fingerprints from the last successful import of each replica into each child geodatabase
+            known_fingerprints = {}
+            if os.path.exists(fingerprint_file):
+                with open(fingerprint_file) as f:
+                    known_fingerprints = json.load(f)
+            # end if
+
+            # leave out the replicas whose schema has not changed since they were last imported
+            update_jobs = []
+            for child_key in children:
+                job = []
+                for replica in child_replicas[child_key]:
+                    replica["export_error"] = export_errors.get(replica["replica"].lower())
+                    replica["fingerprint"] = fingerprints.get(replica["replica"].lower())
+                    replica["fingerprint_key"] = u'{}|{}'.format(replica["replica"].lower(), child_key)
+                    if not force_update and replica["fingerprint"] is not None and known_fingerprints.get(replica["fingerprint_key"]) == replica["fingerprint"]:
+                        # add message
+                        log_message += '\nSchema for {} has not changed since it was last imported; skipped compare and import\n'.format(replica["name"])
+                    else:
+                        job.append(replica)
+                # end for
+                if job:
+                    update_jobs.append(job)
+            # end for
+
+            # compare and import the changes for each child geodatabase
+            # messages are added in the order of the child geodatabases
+            for job, messages in itertools.izip(update_jobs, map_function(update_child, update_jobs)):
+                for replica, (message, imported) in zip(job, messages):
+                    log_message += message
+                    if imported:
+                        known_fingerprints[replica["fingerprint_key"]] = replica["fingerprint"]
+                # end for
+            # end for
+        finally:
+            if pool is not None:
+                pool.terminate()
+        # end try
+
+        # save the fingerprints of the schemas that were imported
+        # written to a temporary file first, so an error does not leave a partial file
+        with open(fingerprint_file + '.tmp', 'w') as f:
+            json.dump(known_fingerprints, f, indent=2, sort_keys=True)
+        if os.path.exists(fingerprint_file):
+            os.remove(fingerprint_file)
+        os.rename(fingerprint_file + '.tmp', fingerprint_file)
+
+        # Get the end time of the geoprocessing tool(s)
+        finish_time = time.time()
+        # Get the total time to run the geoprocessing tool(s)
+        elapsed_time = finish_time - start_time
+        # total time in minutes
+        elapsed_time_minutes =  round((elapsed_time / 60), 2)
+
+        # Write message to a log file
+        log_message += "\nSuccessfully updated replication schemas for departments in {}-minutes on {}\n".format(elapsed_time_minutes,formatted_date_today)
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except EnvironmentError as e:
+        tbE = sys.exc_info()[2]
+        # Write the line number the error occured to the log file
+        log_message += "\nFailed at Line {}\n".format(tbE.tb_lineno)
+        # Write the error message to the log file
+        log_message += "Error: {}".format(str(e))
+    except Exception as e:
+        # If an error occurred, write line number and error message to log
+        tb = sys.exc_info()[2]
+        log_message += "\nFailed at Line {}\n".format(tb.tb_lineno)
+        log_message += "Error: {}".format(e)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
\ No newline at end of file
@@ -0,0 +1,100 @@
+#-------------------------------------------------------------------------------
+# Name:        Wait For Result Helper Module
+#
+# Purpose:     Waits for a geoprocessing Result object (e.g. from an arcpy tool or a
+#              geoprocessing service) to finish. The time between status checks starts
+#              short and grows, so quick tools return right away and long tools are not
+#              polled constantly. The wait can have a deadline, can be cancelled from
+#              another thread with a threading.Event, and can report progress.
+#              The elapsed time is measured when the result finishes.
+#
+#              The deadline and cancel only help for results that are returned before they
+#              finish, such as jobs submitted to a geoprocessing service. ArcPy tools run
+#              in the script (e.g. arcpy.SynchronizeChanges_management) return once they have
+#              finished, so for them this only checks the status and measures the time. To
+#              stop a tool that hangs, run it in a worker process that is stopped at a
+#              deadline (see run_timeout in SDE_to_FileGDB_Replica.py).
+#
+# Author:      Cumberland County GIS
+#
+# Created:     10/18/2026
+# Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+# FITNESS FOR A PARTICULAR PURPOSE.
+# Furthermore, Cumberland County assumes no liability for any errors, omissions, or inaccuracies in the information provided regardless
+# of the cause of such, or for any decision made, action taken, or action not taken by the user in reliance upon any maps or data provided
+# herein. The user assumes the risk that the information may not be accurate.
+#-------------------------------------------------------------------------------
+
+import time
+
+# Result.status values
+status_names = {
+    0: 'New',
+    1: 'Submitted',
+    2: 'Waiting',
+    3: 'Executing',
+    4: 'Succeeded',
+    5: 'Failed',
+    6: 'Timed Out',
+    7: 'Cancelling',
+    8: 'Cancelled',
+    9: 'Deleting',
+    10: 'Deleted'
+}
+# status of a result that has finished
+succeeded = 4
+finished_statuses = (4, 5, 6, 8, 10)
+
+# Raised when a result has not finished by its deadline
+class ResultTimeout(Exception):
+    pass
+
+# Raised when a result finishes without succeeding (failed, timed out, cancelled or deleted)
+class ResultFailed(Exception):
+    pass
+
+# Waits for a geoprocessing result to finish
+# timeout - seconds from start_time before the result is cancelled and ResultTimeout is raised (None waits forever);
+#           only for results that are returned before they finish
+# cancel_event - threading.Event; when it is set the result is cancelled, and the wait ends when the cancel finishes
+# progress - function called as progress(status, elapsed seconds) after each status check
+# start_time - time.time() from before the tool started, so the elapsed time includes the whole run
+#              (defaults to when the wait started)
+# initial_delay, max_delay, backoff - the first wait between status checks, the longest wait, and how much it grows each check
+# raise_on_failure - raise ResultFailed if the result does not succeed
+# returns (status, elapsed seconds)
+def wait_for_result(result, timeout=None, cancel_event=None, progress=None, start_time=None, initial_delay=0.05, max_delay=5.0, backoff=1.5, raise_on_failure=True):
+    if start_time is None:
+        start_time = time.time()
+    deadline = start_time + timeout if timeout is not None else None
+    delay = initial_delay
+    cancel_sent = False
+    while True:
+        # cancel before checking the status, so a cancel is seen as soon as the wait wakes up
+        if cancel_event is not None and cancel_event.is_set() and not cancel_sent:
+            result.cancel()
+            cancel_sent = True
+        status = result.status
+        elapsed = time.time() - start_time
+        if progress is not None:
+            progress(status, elapsed)
+        if status in finished_statuses:
+            break
+        if deadline is not None and time.time() >= deadline:
+            if not cancel_sent:
+                result.cancel()
+            raise ResultTimeout('Result did not finish within {} seconds (status {})'.format(timeout, status_names.get(status, status)))
+        # wait for the next check, but not past the deadline
+        wait = delay if deadline is None else max(min(delay, deadline - time.time()), 0)
+        if cancel_event is not None and not cancel_sent:
+            # wakes up as soon as the wait is cancelled
+            cancel_event.wait(wait)
+        else:
+            time.sleep(wait)
+        delay = min(delay * backoff, max_delay)
+    # end while
+    if raise_on_failure and status != succeeded:
+        raise ResultFailed('Result finished with status {}. {}'.format(status_names.get(status, status), result.getMessages(2)))
+    return status, elapsed
+# end wait_for_result()
@@ -0,0 +1,205 @@
+#-------------------------------------------------------------------------------
+# Name:        XLSX Writer Helper Module
+#
+# Purpose:     Writes rows to a Microsoft Excel (.xlsx) workbook one at a time, without
+#              Excel, ArcGIS or other Python packages. Each worksheet is written to a
+#              temporary file as rows are added, and the worksheets are copied into the
+#              .xlsx (zip) file when it is closed, so memory use stays the same however
+#              many rows are written. When a worksheet reaches the Excel row limit, a new
+#              worksheet is started with the same header row.
+#
+# Author:      Cumberland County GIS
+#
+# Created:     10/18/2026
+# Disclaimer: CUMBERLAND COUNTY ASSUMES NO LIABILITY ARISING FROM USE OF THESE MAPS OR DATA. THE MAPS AND DATA ARE PROVIDED WITHOUT
+# WARRANTY OF ANY KIND, EITHER EXPRESSED OR IMPLIED, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND
+# FITNESS FOR A PARTICULAR PURPOSE.
+# Furthermore, Cumberland County assumes no liability for any errors, omissions, or inaccuracies in the information provided regardless
+# of the cause of such, or for any decision made, action taken, or action not taken by the user in reliance upon any maps or data provided
+# herein. The user assumes the risk that the information may not be accurate.
+#-------------------------------------------------------------------------------
+
+import os
+import re
+import math
+import datetime
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+# most rows in an Excel worksheet
+max_sheet_rows = 1048576
+# most characters in an Excel cell
+max_cell_characters = 32767
+# characters that are not allowed in XML
+illegal_xml_characters = re.compile(u'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+# characters that are not allowed in worksheet names
+illegal_sheet_characters = re.compile(u'[\\[\\]:*?/\\\\]')
+# day 0 of Excel dates
+excel_epoch = datetime.datetime(1899, 12, 30)
+
+content_types_xml = u'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+{}
+</Types>'''
+
+root_rels_xml = u'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>'''
+
+workbook_xml = u'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets>{}</sheets>
+</workbook>'''
+
+workbook_rels_xml = u'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+{}
+<Relationship Id="rIdStyles" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>'''
+
+# style 0 is the default, style 1 formats dates (built in number format 22, m/d/yyyy h:mm), style 2 makes the header row bold
+styles_xml = u'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>'''
+
+# Returns the Excel column letters of a column number (0 is A, 26 is AA)
+def column_letters(column):
+    letters = ''
+    column += 1
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+# end column_letters()
+
+# Returns the XML of one cell, or '' for empty (None) values
+# numbers are written as numbers, dates as Excel dates, and anything else as text
+# style is the index of the cell format in styles_xml (dates always use style 1)
+def cell_xml(reference, value, style=0):
+    if value is None:
+        return u''
+    if isinstance(value, bool):
+        cell_type, value = u' t="b"', int(value)
+    elif isinstance(value, (int, long)):
+        cell_type = u''
+    elif isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return u''
+        cell_type, value = u'', repr(value)
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        if not isinstance(value, datetime.datetime):
+            value = datetime.datetime(value.year, value.month, value.day)
+        delta = value.replace(tzinfo=None) - excel_epoch
+        cell_type, value, style = u'', repr(delta.days + delta.seconds / 86400.0 + delta.microseconds / 86400000000.0), 1
+    else:
+        if not isinstance(value, unicode):
+            value = str(value).decode('utf-8', 'replace')
+        value = illegal_xml_characters.sub(u'', value)[:max_cell_characters]
+        return u'<c r="{}"{} t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(reference, u' s="{}"'.format(style) if style else u'', escape(value))
+    return u'<c r="{}"{}{}><v>{}</v></c>'.format(reference, u' s="{}"'.format(style) if style else u'', cell_type, value)
+# end cell_xml()
+
+# Writes rows to an .xlsx workbook
+# e.g.
+#   with XlsxWriter(r'C:\GIS\Parcels.xlsx', 'Parcels', ['Parcel ID', 'Owner']) as workbook:
+#       workbook.write_row([1, 'Smith'])
+class XlsxWriter(object):
+    # path is the .xlsx file, sheet_name the name of the (first) worksheet, and headers the values of the header row
+    def __init__(self, path, sheet_name='Sheet', headers=None):
+        self.path = path
+        self.sheet_name = illegal_sheet_characters.sub(u'_', unicode(sheet_name))[:31] or u'Sheet'
+        self.headers = list(headers) if headers else []
+        self.sheets = []
+        self.sheet_file = None
+        self.sheet_rows = 0
+        self.row_count = 0
+    # end __init__()
+
+    # Starts a new worksheet in a temporary file, with the header row
+    def start_sheet(self):
+        self.finish_sheet()
+        handle, sheet_path = tempfile.mkstemp('.xml', 'sheet', os.path.dirname(os.path.abspath(self.path)))
+        self.sheet_file = os.fdopen(handle, 'wb')
+        number = len(self.sheets) + 1
+        # later worksheets are named e.g. Parcels (2)
+        name = self.sheet_name if number == 1 else u'{} ({})'.format(self.sheet_name[:31 - len(str(number)) - 3], number)
+        self.sheets.append((name, sheet_path))
+        self.sheet_rows = 0
+        self.sheet_file.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+        if self.headers:
+            self.write_sheet_row(self.headers, 2)
+    # end start_sheet()
+
+    # Writes the values of one row to the current worksheet
+    # style is used for every cell, e.g. 2 for the bold header row
+    def write_sheet_row(self, values, style=0):
+        self.sheet_rows += 1
+        row = self.sheet_rows
+        cells = u''.join(cell_xml(u'{}{}'.format(column_letters(column), row), value, style) for column, value in enumerate(values))
+        self.sheet_file.write(u'<row r="{}">{}</row>'.format(row, cells).encode('utf-8'))
+    # end write_sheet_row()
+
+    # Writes a row of values, starting a new worksheet when the current one is full
+    def write_row(self, values):
+        if self.sheet_file is None or self.sheet_rows >= max_sheet_rows:
+            self.start_sheet()
+        self.write_sheet_row(values)
+        self.row_count += 1
+    # end write_row()
+
+    # Finishes the XML of the current worksheet
+    def finish_sheet(self):
+        if self.sheet_file is not None:
+            self.sheet_file.write(b'</sheetData></worksheet>')
+            self.sheet_file.close()
+            self.sheet_file = None
+    # end finish_sheet()
+
+    # Writes the .xlsx file and deletes the temporary worksheet files
+    def close(self):
+        if self.sheet_file is None and not self.sheets:
+            # a workbook with only the header row
+            self.start_sheet()
+        self.finish_sheet()
+        try:
+            with zipfile.ZipFile(self.path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as workbook:
+                overrides = u''.join(u'<Override PartName="/xl/worksheets/sheet{}.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'.format(number) for number in range(1, len(self.sheets) + 1))
+                workbook.writestr('[Content_Types].xml', content_types_xml.format(overrides).encode('utf-8'))
+                workbook.writestr('_rels/.rels', root_rels_xml.encode('utf-8'))
+                sheets = u''.join(u'<sheet name="{}" sheetId="{}" r:id="rId{}"/>'.format(escape(name, {'"': '&quot;'}), number, number) for number, (name, sheet_path) in enumerate(self.sheets, 1))
+                workbook.writestr('xl/workbook.xml', workbook_xml.format(sheets).encode('utf-8'))
+                relationships = u''.join(u'<Relationship Id="rId{}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet{}.xml"/>'.format(number, number) for number in range(1, len(self.sheets) + 1))
+                workbook.writestr('xl/_rels/workbook.xml.rels', workbook_rels_xml.format(relationships).encode('utf-8'))
+                workbook.writestr('xl/styles.xml', styles_xml.encode('utf-8'))
+                for number, (name, sheet_path) in enumerate(self.sheets, 1):
+                    workbook.write(sheet_path, 'xl/worksheets/sheet{}.xml'.format(number))
+                # end for
+            # end with
+        finally:
+            for name, sheet_path in self.sheets:
+                try:
+                    os.remove(sheet_path)
+                except EnvironmentError:
+                    pass
+            # end for
+    # end close()
+
+    def __enter__(self):
+        return self
+
+    # the workbook is written even if an error stops the rows, so the rows written so far are kept
+    def __exit__(self, *args):
+        self.close()
+# end XlsxWriter